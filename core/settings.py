@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import importlib.util
 import os
 from pathlib import Path
+import django
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -90,8 +93,49 @@ if os.environ.get('USE_POSTGRES', 'False') == 'True':
             'PASSWORD': os.environ.get('DB_PASSWORD', 'postgres'),
             'HOST': os.environ.get('DB_HOST', 'db'),
             'PORT': os.environ.get('DB_PORT', '5432'),
+            # Keep connections open between requests instead of reconnecting
+            # every time; health checks drop connections that went away.
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS', 'True') == 'True',
+            'OPTIONS': {
+                'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', '5')),
+            },
         }
     }
+
+    # Optional psycopg connection pool (requires Django 5.1+ and
+    # psycopg[pool], see requirements-pool.txt). Django manages pooled
+    # connections itself, so persistent connections must be turned off.
+    if os.environ.get('DB_POOL', 'False') == 'True':
+        if django.VERSION < (5, 1):
+            raise ImproperlyConfigured(
+                f'DB_POOL=True needs Django 5.1 or newer; Django {django.get_version()} is installed.'
+            )
+        if importlib.util.find_spec('psycopg_pool') is None:
+            raise ImproperlyConfigured(
+                'DB_POOL=True needs psycopg 3 with its pool extra: pip install -r requirements-pool.txt'
+            )
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', '10')),
+            'timeout': int(os.environ.get('DB_POOL_TIMEOUT', '10')),
+        }
+
+    # Optional read replica for the read-only flag and audit endpoints. Its
+    # connections enforce the flag read latency budget (FLAGS_FALLBACK) for
+    # the whole session, so reads need no extra round trips to set it.
+    if os.environ.get('DB_REPLICA_HOST'):
+        DATABASES['replica'] = {
+            **DATABASES['default'],
+            'OPTIONS': {
+                **DATABASES['default']['OPTIONS'],
+                'options': f"-c statement_timeout={int(os.environ.get('FLAGS_LATENCY_BUDGET_MS', '250'))}",
+            },
+            'HOST': os.environ['DB_REPLICA_HOST'],
+            'PORT': os.environ.get('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+            'TEST': {'MIRROR': 'default'},
+        }
 else:
     DATABASES = {
         'default': {
@@ -100,6 +144,28 @@ else:
         }
     }
 
+DATABASE_ROUTERS = ['flags.routers.ReadReplicaRouter']
+FLAGS_READ_REPLICA_ALIAS = 'replica'
+
+# Flag reads that fail or exceed the latency budget are answered from the
+# last known snapshot (see flags/fallback.py).
+FLAGS_FALLBACK = {
+    'LATENCY_BUDGET_MS': int(os.environ.get('FLAGS_LATENCY_BUDGET_MS', '250')),
+    'SNAPSHOT_PATH': os.environ.get('FLAGS_SNAPSHOT_PATH') or None,
+    'SNAPSHOT_MAX_AGE': int(os.environ.get('FLAGS_SNAPSHOT_MAX_AGE', '30')),
+    'RETRY_INTERVAL': int(os.environ.get('FLAGS_SNAPSHOT_RETRY_INTERVAL', '5')),
+    'BACKGROUND_REFRESH': os.environ.get('FLAGS_SNAPSHOT_BACKGROUND_REFRESH', 'True') == 'True',
+}
+
+# Outbound webhook delivery (see flags/webhooks.py and manage.py deliver_webhooks).
+FLAGS_WEBHOOKS = {
+    'TIMEOUT': int(os.environ.get('FLAGS_WEBHOOK_TIMEOUT', '5')),
+    'MAX_ATTEMPTS': int(os.environ.get('FLAGS_WEBHOOK_MAX_ATTEMPTS', '8')),
+    'BACKOFF_BASE': int(os.environ.get('FLAGS_WEBHOOK_BACKOFF_BASE', '2')),
+    'BACKOFF_MAX': int(os.environ.get('FLAGS_WEBHOOK_BACKOFF_MAX', '600')),
+    'LEASE': int(os.environ.get('FLAGS_WEBHOOK_LEASE', '60')),
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -153,9 +219,10 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 100,
-    # 'DEFAULT_RENDERER_CLASSES': [
-    #     'rest_framework.renderers.JSONRenderer',
-    # ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'flags.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
     ],
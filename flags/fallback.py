@@ -0,0 +1,296 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import DatabaseError, connections, router, transaction
+from django.dispatch import receiver
+from rest_framework import serializers
+from .models import Flag, Dependency
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'LATENCY_BUDGET_MS': 250,
+    'SNAPSHOT_PATH': None,
+    'SNAPSHOT_MAX_AGE': 30,
+    'RETRY_INTERVAL': 5,
+    'BACKGROUND_REFRESH': True,
+}
+
+
+def fallback_settings():
+    return {**DEFAULTS, **getattr(settings, 'FLAGS_FALLBACK', {})}
+
+
+def _session_statement_timeout(connection):
+    """True if the connection sets ``statement_timeout`` when it opens (see the replica in settings)."""
+    return 'statement_timeout' in connection.settings_dict.get('OPTIONS', {}).get('options', '')
+
+
+@contextmanager
+def latency_budget(alias, budget_ms):
+    """Abort queries on ``alias`` that run longer than ``budget_ms``.
+
+    Postgres enforces it with ``statement_timeout``: for the whole session
+    when the alias is configured with it, otherwise with ``SET LOCAL`` in a
+    transaction around the block. SQLite uses a progress handler that
+    interrupts the running statement. Either way the query fails with
+    ``OperationalError``.
+    """
+    connection = connections[alias]
+    if connection.vendor == 'postgresql':
+        if _session_statement_timeout(connection):
+            yield
+            return
+        with transaction.atomic(using=alias):
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL statement_timeout = %s', [int(budget_ms)])
+            yield
+    elif connection.vendor == 'sqlite':
+        connection.ensure_connection()
+        raw = connection.connection
+        deadline = time.monotonic() + budget_ms / 1000
+        raw.set_progress_handler(lambda: int(time.monotonic() > deadline), 1000)
+        try:
+            yield
+        finally:
+            raw.set_progress_handler(None, 0)
+    else:
+        yield
+
+
+@contextmanager
+def without_statement_timeout(alias):
+    """Run the block in one transaction on ``alias`` with any session ``statement_timeout`` lifted."""
+    connection = connections[alias]
+    with transaction.atomic(using=alias):
+        if connection.vendor == 'postgresql' and _session_statement_timeout(connection):
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL statement_timeout = 0')
+        yield
+
+
+class SnapshotStore:
+    """Last known state of every flag, plus fallback bookkeeping.
+
+    The snapshot is rebuilt in the background when it gets older than
+    ``SNAPSHOT_MAX_AGE`` (never, if that is ``None``) and, if
+    ``SNAPSHOT_PATH`` is set, written to disk so a restarted process can
+    serve it while the database is down.
+    """
+
+    def __init__(self, options):
+        self.options = options
+        self.rows = {}
+        self.taken_at = None
+        self.degraded = False
+        self.metrics = defaultdict(int)
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._load_from_disk()
+
+    @property
+    def has_data(self):
+        return self.taken_at is not None
+
+    def age(self):
+        return None if self.taken_at is None else max(time.time() - self.taken_at, 0)
+
+    def incr(self, name):
+        with self._lock:
+            self.metrics[name] += 1
+
+    def refresh(self):
+        """Rebuild the snapshot from the database (two queries)."""
+        to_datetime = serializers.DateTimeField().to_representation
+        dependencies = defaultdict(list)
+        for flag_id, name in Dependency.objects.values_list('flag_id', 'dependency_on__name'):
+            dependencies[flag_id].append(name)
+        rows = {}
+        for pk, name, description, is_active, created_at, updated_at in Flag.objects.order_by('id').values_list(
+            'id', 'name', 'description', 'is_active', 'created_at', 'updated_at'
+        ):
+            rows[pk] = {
+                'id': pk,
+                'name': name,
+                'description': description,
+                'is_active': is_active,
+                'created_at': to_datetime(created_at),
+                'updated_at': to_datetime(updated_at),
+                'dependencies': dependencies[pk],
+            }
+        taken_at = time.time()
+        with self._lock:
+            self.rows = rows
+            self.taken_at = taken_at
+            self.degraded = False
+            self.metrics['snapshot_refreshes'] += 1
+        self._save_to_disk(rows, taken_at)
+
+    def refresh_async(self, until_recovered=False):
+        """Refresh in a background thread; only one refresh runs at a time.
+
+        With ``until_recovered`` the thread keeps retrying every
+        ``RETRY_INTERVAL`` seconds until the database answers again.
+        """
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        background = self.options['BACKGROUND_REFRESH']
+
+        def run():
+            # Inline (test) refreshes make a single attempt instead of blocking.
+            delay = until_recovered and background
+            try:
+                while True:
+                    if delay:
+                        time.sleep(self.options['RETRY_INTERVAL'])
+                    try:
+                        self.refresh()
+                    except DatabaseError:
+                        self.incr('snapshot_refresh_failures')
+                    finally:
+                        if background:
+                            connections.close_all()
+                    # Checked under the lock that mark_degraded() takes, so a
+                    # refresh that was already running when the database went
+                    # down keeps retrying instead of leaving nobody to recover.
+                    with self._lock:
+                        if not (background and self.degraded):
+                            self._refreshing = False
+                            return
+                    delay = True
+            except BaseException:
+                with self._lock:
+                    self._refreshing = False
+                raise
+
+        if background:
+            threading.Thread(target=run, name='flag-snapshot-refresh', daemon=True).start()
+        else:
+            run()
+
+    def mark_degraded(self):
+        with self._lock:
+            self.degraded = True
+        self.refresh_async(until_recovered=True)
+
+    def snapshot_metrics(self):
+        with self._lock:
+            data = dict(self.metrics)
+            degraded, size = self.degraded, len(self.rows)
+        age = self.age()
+        return {
+            'fresh': data.get('fresh', 0),
+            'stale_served': data.get('stale_served', 0),
+            'db_errors': data.get('db_errors', 0),
+            'budget_exceeded': data.get('budget_exceeded', 0),
+            'snapshot_refreshes': data.get('snapshot_refreshes', 0),
+            'snapshot_refresh_failures': data.get('snapshot_refresh_failures', 0),
+            'degraded': degraded,
+            'snapshot_flags': size,
+            'snapshot_age_seconds': None if age is None else round(age, 3),
+        }
+
+    def _save_to_disk(self, rows, taken_at):
+        path = self.options['SNAPSHOT_PATH']
+        if not path:
+            return
+        try:
+            directory = os.path.dirname(os.path.abspath(path))
+            with tempfile.NamedTemporaryFile('w', dir=directory, delete=False, suffix='.tmp') as fh:
+                json.dump({'taken_at': taken_at, 'flags': list(rows.values())}, fh)
+            os.replace(fh.name, path)
+        except OSError:
+            logger.exception('Could not write flag snapshot to %s', path)
+
+    def _load_from_disk(self):
+        path = self.options['SNAPSHOT_PATH']
+        if not path or not os.path.exists(path):
+            return
+        try:
+            with open(path) as fh:
+                data = json.load(fh)
+            self.rows = {row['id']: row for row in data['flags']}
+            self.taken_at = data['taken_at']
+        except (OSError, ValueError, KeyError):
+            logger.exception('Ignoring unreadable flag snapshot at %s', path)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_snapshot_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SnapshotStore(fallback_settings())
+    return _store
+
+
+def reset_snapshot_store():
+    global _store
+    with _store_lock:
+        _store = None
+
+
+@receiver(setting_changed)
+def _reset_on_setting_changed(setting, **kwargs):
+    if setting == 'FLAGS_FALLBACK':
+        reset_snapshot_store()
+
+
+def serve_with_fallback(fresh, stale):
+    """Call ``fresh()`` under the latency budget, or ``stale(rows)`` if it fails.
+
+    ``stale`` receives the snapshot rows (ordered by id) and must build the
+    same response shape as ``fresh``; the result is marked with
+    ``X-Flags-Stale`` and ``Warning: 110`` headers. While the database is
+    known to be down, the snapshot is served without trying it.
+    """
+    store = get_snapshot_store()
+    options = store.options
+
+    if store.degraded and store.has_data:
+        return _stale_response(store, stale)
+
+    budget = options['LATENCY_BUDGET_MS']
+    started = time.monotonic()
+    try:
+        with latency_budget(router.db_for_read(Flag), budget):
+            response = fresh()
+    except DatabaseError:
+        elapsed_ms = (time.monotonic() - started) * 1000
+        store.incr('budget_exceeded' if elapsed_ms >= budget else 'db_errors')
+        has_data = store.has_data
+        store.mark_degraded()
+        if not has_data:
+            raise
+        return _stale_response(store, stale)
+
+    store.incr('fresh')
+    age = store.age()
+    max_age = options['SNAPSHOT_MAX_AGE']
+    if max_age is not None and (age is None or age > max_age):
+        store.refresh_async()
+    return response
+
+
+def _stale_response(store, stale):
+    store.incr('stale_served')
+    rows = sorted(store.rows.values(), key=lambda row: row['id'])
+    response = stale(rows)
+    response['X-Flags-Stale'] = 'true'
+    response['X-Flags-Snapshot-Age'] = str(int(store.age() or 0))
+    response['Warning'] = '110 - "Response is Stale"'
+    return response
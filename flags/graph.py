@@ -0,0 +1,218 @@
+import threading
+from django.db import router
+from django.db.models import Count, Max
+from django.utils import timezone
+from .fallback import without_statement_timeout
+from .models import Flag, Dependency
+
+try:
+    _popcount = int.bit_count
+except AttributeError:  # Python < 3.10
+    def _popcount(value):
+        return bin(value).count('1')
+
+
+def graph_fingerprint():
+    """Cheap value that changes whenever flags or dependency edges are added or removed.
+
+    Toggles do not change it, so they do not invalidate cached reports.
+    """
+    flags = Flag.objects.aggregate(count=Count('id'), max_id=Max('id'))
+    deps = Dependency.objects.aggregate(count=Count('id'), max_id=Max('id'), latest=Max('created_at'))
+    return (flags['count'], flags['max_id'], deps['count'], deps['max_id'], deps['latest'])
+
+
+def _strongly_connected_components(n, children):
+    """Iterative Tarjan; returns ``comp`` (node -> component) in reverse topological order.
+
+    Component 0 has no path to any higher-numbered component, i.e. components
+    are numbered sinks first.
+    """
+    index = [-1] * n
+    low = [0] * n
+    on_stack = [False] * n
+    comp = [-1] * n
+    stack = []
+    counter = 0
+    comp_count = 0
+
+    for root in range(n):
+        if index[root] != -1:
+            continue
+        work = [(root, 0)]
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        while work:
+            node, i = work[-1]
+            if i < len(children[node]):
+                work[-1] = (node, i + 1)
+                child = children[node][i]
+                if index[child] == -1:
+                    index[child] = low[child] = counter
+                    counter += 1
+                    stack.append(child)
+                    on_stack[child] = True
+                    work.append((child, 0))
+                elif on_stack[child]:
+                    low[node] = min(low[node], index[child])
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] == index[node]:
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    comp[member] = comp_count
+                    if member == node:
+                        break
+                comp_count += 1
+    return comp, comp_count
+
+
+def analyze_graph(nodes, edges):
+    """Compute per-flag graph statistics.
+
+    ``nodes`` is a list of ``(id, name)``; ``edges`` an iterable of
+    ``(dependency_on_id, flag_id)`` pairs, i.e. parent -> dependent.
+
+    Fan-in/fan-out, cycle detection (Tarjan) and both chain depths (dynamic
+    programming over the condensed DAG) are linear in flags + edges.
+    Transitive dependent counts are exact: reachability sets are kept as
+    Python int bitsets, merged child-to-parent and freed once every parent
+    has consumed them.
+    """
+    position = {pk: i for i, (pk, _) in enumerate(nodes)}
+    n = len(nodes)
+    children = [[] for _ in range(n)]
+    fan_in = [0] * n
+    edge_count = 0
+    for parent_id, child_id in edges:
+        parent, child = position.get(parent_id), position.get(child_id)
+        if parent is None or child is None:
+            # Nodes and edges are read by separate queries; skip edges of
+            # flags created or deleted in between.
+            continue
+        children[parent].append(child)
+        fan_in[child] += 1
+        edge_count += 1
+
+    comp, comp_count = _strongly_connected_components(n, children)
+
+    members = [[] for _ in range(comp_count)]
+    for node in range(n):
+        members[comp[node]].append(node)
+    comp_children = [set() for _ in range(comp_count)]
+    self_loop = [False] * comp_count
+    for node in range(n):
+        for child in children[node]:
+            if comp[child] != comp[node]:
+                comp_children[comp[node]].add(comp[child])
+            elif child == node:
+                self_loop[comp[node]] = True
+    comp_parent_count = [0] * comp_count
+    for c in range(comp_count):
+        for child in comp_children[c]:
+            comp_parent_count[child] += 1
+
+    # Components are numbered sinks first, so walking upwards visits every
+    # child before its parents.
+    cascade_depth = [0] * comp_count
+    reach = [0] * comp_count
+    dependents = [0] * comp_count
+    pending_parents = list(comp_parent_count)
+    # Bits are handed out in processing order, so the sets of the many
+    # low-level flags stay small integers.
+    next_bit = 0
+    for c in range(comp_count):
+        bits = 0
+        for _ in members[c]:
+            bits |= 1 << next_bit
+            next_bit += 1
+        for child in comp_children[c]:
+            cascade_depth[c] = max(cascade_depth[c], cascade_depth[child] + 1)
+            bits |= reach[child]
+            pending_parents[child] -= 1
+            if pending_parents[child] == 0:
+                reach[child] = 0
+        reach[c] = bits
+        # Members of a cycle depend on each other, so they count too.
+        dependents[c] = _popcount(bits) - 1
+        if comp_parent_count[c] == 0:
+            reach[c] = 0
+
+    depth = [0] * comp_count
+    for c in range(comp_count - 1, -1, -1):
+        for child in comp_children[c]:
+            depth[child] = max(depth[child], depth[c] + 1)
+
+    stats = []
+    for node, (pk, name) in enumerate(nodes):
+        c = comp[node]
+        stats.append({
+            'id': pk,
+            'name': name,
+            'transitive_dependents': dependents[c],
+            'cascade_depth': cascade_depth[c],
+            'depth': depth[c],
+            'fan_in': fan_in[node],
+            'fan_out': len(children[node]),
+        })
+
+    cycles = [
+        sorted(nodes[node][1] for node in members[c])
+        for c in range(comp_count)
+        if len(members[c]) > 1 or self_loop[c]
+    ]
+    return {
+        'flags': n,
+        'edges': edge_count,
+        'max_depth': max(depth, default=0),
+        'max_cascade_depth': max(cascade_depth, default=0),
+        'cycles': cycles,
+        'stats': stats,
+    }
+
+
+def build_graph_report(top=10):
+    """Load the graph once and return the analysis with the top-N hotspots."""
+    # Loading a large graph may take longer than the read alias's latency budget.
+    with without_statement_timeout(router.db_for_read(Flag)):
+        nodes = list(Flag.objects.order_by('id').values_list('id', 'name'))
+        edges = Dependency.objects.values_list('dependency_on_id', 'flag_id').iterator(chunk_size=10000)
+        report = analyze_graph(nodes, edges)
+    report['hotspots'] = hotspots(report['stats'], top)
+    report['computed_at'] = timezone.now().isoformat()
+    return report
+
+
+def hotspots(stats, top):
+    ranked = sorted(
+        stats,
+        key=lambda row: (-row['transitive_dependents'], -row['cascade_depth'], row['name']),
+    )
+    return ranked[:top]
+
+
+_cache_lock = threading.Lock()
+_cached = {}
+
+
+def get_graph_report(top=10):
+    """Return the report for the current graph, recomputing only when it changed."""
+    fingerprint = graph_fingerprint()
+    with _cache_lock:
+        cached = _cached.get('report')
+        if cached is not None and cached[0] == fingerprint:
+            report = dict(cached[1], cached=True)
+            if top != len(report['hotspots']):
+                report['hotspots'] = hotspots(report['stats'], top)
+            return report
+
+    report = build_graph_report(top)
+    with _cache_lock:
+        _cached['report'] = (fingerprint, report)
+    return dict(report, cached=False)
@@ -0,0 +1,299 @@
+import asyncio
+import contextvars
+import http.client
+import io
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from django.db import connections
+from django.db.backends.signals import connection_created
+from .models import Flag, Dependency
+
+# Share of requests per endpoint: ~95% reads/evaluations, 4% toggles, 1% creates.
+TRAFFIC_MIX = {
+    'evaluate': 45,
+    'detail': 40,
+    'list': 10,
+    'toggle': 4,
+    'create': 1,
+}
+
+_query_counter = contextvars.ContextVar('loadtest_query_counter', default=None)
+
+
+def _count_queries(execute, sql, params, many, context):
+    counter = _query_counter.get()
+    if counter is not None:
+        counter[0] += 1
+    return execute(sql, params, many, context)
+
+
+def _install_query_counter(sender, connection, **kwargs):
+    if _count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_queries)
+
+
+def seed_graph(prefix, count, max_deps, active_ratio=0.7, rng=None):
+    """Create ``count`` flags named ``<prefix><i>`` wired into a random DAG.
+
+    Each flag depends on up to ``max_deps`` flags with a lower index, so the
+    graph is acyclic. A flag is only active when all of its parents are,
+    matching what the toggle endpoint allows.
+    """
+    rng = rng or random.Random()
+    Flag.objects.filter(name__startswith=prefix).delete()
+
+    flags = Flag.objects.bulk_create(
+        [Flag(name=f'{prefix}{i}', description='load test flag') for i in range(count)]
+    )
+    if not all(flag.pk for flag in flags):
+        # Backends without RETURNING on bulk inserts.
+        flags = list(Flag.objects.filter(name__startswith=prefix).order_by('id'))
+
+    edges = []
+    active_ids = set()
+    for i, flag in enumerate(flags):
+        parents = rng.sample(flags[:i], rng.randint(0, min(max_deps, i))) if i else []
+        edges += [Dependency(flag=flag, dependency_on=parent) for parent in parents]
+        if rng.random() < active_ratio and all(parent.id in active_ids for parent in parents):
+            active_ids.add(flag.id)
+    Dependency.objects.bulk_create(edges, batch_size=1000)
+    Flag.objects.filter(id__in=active_ids).update(is_active=True)
+    return [flag.id for flag in flags], [flag.name for flag in flags]
+
+
+class WSGITarget:
+    """Calls ``core.wsgi.application`` in-process."""
+    name = 'wsgi'
+    counts_queries = True
+
+    def __init__(self):
+        from core.wsgi import application
+        self.application = application
+
+    def request(self, method, path, query='', body=b''):
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'SERVER_NAME': 'localhost',
+            'SERVER_PORT': '80',
+            'HTTP_HOST': 'localhost',
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': io.StringIO(),
+            'wsgi.url_scheme': 'http',
+            'wsgi.version': (1, 0),
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        status = []
+        response = self.application(environ, lambda s, headers, exc_info=None: status.append(s))
+        try:
+            b''.join(response)
+        finally:
+            if hasattr(response, 'close'):
+                response.close()
+        return int(status[0].split()[0])
+
+
+class ASGITarget:
+    """Calls ``core.asgi.application`` in-process, one event loop per client thread."""
+    name = 'asgi'
+    counts_queries = True
+
+    def __init__(self):
+        from core.asgi import application
+        self.application = application
+        self.local = threading.local()
+
+    async def _call(self, method, path, query, body):
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': method,
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': query.encode(),
+            'root_path': '',
+            'headers': [
+                (b'host', b'localhost'),
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode()),
+            ],
+            'client': ('127.0.0.1', 0),
+            'server': ('localhost', 80),
+        }
+        received = asyncio.Event()
+        status = []
+
+        async def receive():
+            if not received.is_set():
+                received.set()
+                return {'type': 'http.request', 'body': body, 'more_body': False}
+            # Never disconnect; Django cancels this wait once the response is sent.
+            await asyncio.Future()
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status.append(message['status'])
+
+        await self.application(scope, receive, send)
+        return status[0]
+
+    def request(self, method, path, query='', body=b''):
+        loop = getattr(self.local, 'loop', None)
+        if loop is None:
+            loop = self.local.loop = asyncio.new_event_loop()
+        return loop.run_until_complete(self._call(method, path, query, body))
+
+
+class HTTPTarget:
+    """Sends requests to an already running server (gunicorn, uvicorn, runserver)."""
+    name = 'http'
+    counts_queries = False
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.base_path = parts.path.rstrip('/')
+        self.local = threading.local()
+
+    def request(self, method, path, query='', body=b''):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.local.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        target = self.base_path + path + (f'?{query}' if query else '')
+        try:
+            conn.request(method, target, body=body or None, headers={'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            response.read()
+            return response.status
+        except (http.client.HTTPException, OSError):
+            self.local.conn = None
+            conn.close()
+            raise
+
+
+def _build_request(kind, flag_ids, flag_names, rng):
+    if kind == 'evaluate':
+        return 'GET', '/api/flags/', 'view=state', b''
+    if kind == 'detail':
+        return 'GET', f'/api/flags/{rng.choice(flag_ids)}/', '', b''
+    if kind == 'list':
+        return 'GET', '/api/flags/', f'page={rng.randint(1, max(len(flag_ids) // 100, 1))}', b''
+    if kind == 'toggle':
+        body = {'active': rng.random() < 0.5, 'actor': 'loadtest', 'reason': 'load test'}
+        return 'PATCH', f'/api/flags/{rng.choice(flag_ids)}/toggle/', '', json.dumps(body).encode()
+    body = {
+        'name': f'loadtest-new-{uuid.uuid4().hex[:12]}',
+        'description': 'created by load test',
+        'dependencies': rng.sample(flag_names, min(len(flag_names), rng.randint(1, 3))),
+    }
+    return 'POST', '/api/flags/', '', json.dumps(body).encode()
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    # Nearest-rank percentile.
+    index = max(math.ceil(pct / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[index]
+
+
+def run_load(target, flag_ids, flag_names, total_requests, concurrency, mix=None, seed=None):
+    """Drive ``target`` with ``concurrency`` clients and return the report dict."""
+    mix = mix or TRAFFIC_MIX
+    kinds, weights = zip(*mix.items())
+    plan_rng = random.Random(seed)
+    plan = plan_rng.choices(kinds, weights=weights, k=total_requests)
+    samples = defaultdict(list)
+    lock = threading.Lock()
+
+    if target.counts_queries:
+        connection_created.connect(_install_query_counter)
+        for conn in connections.all():
+            if conn.connection is not None:
+                _install_query_counter(None, conn)
+
+    def client(worker, kinds_for_worker):
+        rng = random.Random(None if seed is None else seed + worker)
+        local = []
+        for kind in kinds_for_worker:
+            request = _build_request(kind, flag_ids, flag_names, rng)
+            counter = [0]
+            token = _query_counter.set(counter)
+            started = time.perf_counter()
+            try:
+                status = target.request(*request)
+            except Exception:
+                status = None
+            finally:
+                elapsed = time.perf_counter() - started
+                _query_counter.reset(token)
+            local.append((kind, status, elapsed, counter[0]))
+        connections.close_all()
+        with lock:
+            for kind, status, elapsed, queries in local:
+                samples[kind].append((status, elapsed, queries))
+
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            futures = [
+                pool.submit(contextvars.copy_context().run, client, worker, plan[worker::concurrency])
+                for worker in range(concurrency)
+            ]
+            for future in futures:
+                future.result()
+    finally:
+        if target.counts_queries:
+            connection_created.disconnect(_install_query_counter)
+    wall_time = time.perf_counter() - started
+
+    endpoints = {}
+    for kind in kinds:
+        rows = samples.get(kind, [])
+        latencies = sorted(elapsed * 1000 for _, elapsed, _ in rows)
+        errors = sum(1 for status, _, _ in rows if status is None or status >= 500)
+        statuses = defaultdict(int)
+        for status, _, _ in rows:
+            statuses[str(status)] += 1
+        endpoints[kind] = {
+            'requests': len(rows),
+            'throughput_rps': round(len(rows) / wall_time, 2) if wall_time else None,
+            'p50_ms': _round(_percentile(latencies, 50)),
+            'p99_ms': _round(_percentile(latencies, 99)),
+            'error_rate': round(errors / len(rows), 4) if rows else 0.0,
+            'queries_per_request': (
+                round(sum(q for _, _, q in rows) / len(rows), 2) if rows and target.counts_queries else None
+            ),
+            'status_codes': dict(statuses),
+        }
+
+    total = sum(len(rows) for rows in samples.values())
+    return {
+        'target': target.name,
+        'concurrency': concurrency,
+        'requests': total,
+        'flags': len(flag_ids),
+        'wall_time_s': round(wall_time, 3),
+        'throughput_rps': round(total / wall_time, 2) if wall_time else None,
+        'mix': dict(mix),
+        'endpoints': endpoints,
+    }
+
+
+def _round(value):
+    return None if value is None else round(value, 3)
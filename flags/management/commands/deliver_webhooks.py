@@ -0,0 +1,36 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+from flags.webhooks import deliver_pending, next_attempt_at
+
+class Command(BaseCommand):
+    help = 'Delivers queued flag change events to webhook subscribers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-sleep', type=float, default=5.0,
+                            help='Upper bound in seconds between checks for new events.')
+        parser.add_argument('--once', action='store_true',
+                            help='Deliver everything currently due and exit.')
+
+    def handle(self, *args, **options):
+        max_sleep = options['max_sleep']
+        self.stdout.write('Webhook delivery started.')
+
+        while True:
+            close_old_connections()
+            totals = deliver_pending()
+            if totals['batches']:
+                self.stdout.write(
+                    f"Sent {totals['batches']} batch(es): {totals['delivered']} delivered, {totals['failed']} failed"
+                )
+            if options['once']:
+                break
+
+            due = next_attempt_at()
+            delay = max_sleep
+            if due is not None:
+                delay = min(max((due - timezone.now()).total_seconds(), 0), max_sleep)
+            time.sleep(delay)
+
+        self.stdout.write(self.style.SUCCESS('Webhook delivery finished.'))
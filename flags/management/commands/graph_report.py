@@ -0,0 +1,36 @@
+import json
+from django.core.management.base import BaseCommand
+from flags.graph import build_graph_report
+
+class Command(BaseCommand):
+    help = 'Reports dependency depth, fan-in/fan-out and the flags with the most transitive dependents'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=10, help='Number of hotspots to list.')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON.')
+        parser.add_argument('--all', action='store_true', help='Include every flag in the JSON output.')
+
+    def handle(self, *args, **options):
+        report = build_graph_report(options['top'])
+        if not options['all']:
+            report.pop('stats')
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(
+            f"{report['flags']} flags, {report['edges']} dependencies, "
+            f"max depth {report['max_depth']}, max cascade depth {report['max_cascade_depth']}"
+        )
+        if report['cycles']:
+            self.stdout.write(self.style.WARNING(f"{len(report['cycles'])} dependency cycle(s):"))
+            for cycle in report['cycles']:
+                self.stdout.write('  ' + ', '.join(cycle))
+
+        self.stdout.write(f"{'flag':<40} {'dependents':>10} {'cascade':>8} {'depth':>6} {'fan-in':>7} {'fan-out':>8}")
+        for row in report['hotspots']:
+            self.stdout.write(
+                f"{row['name']:<40} {row['transitive_dependents']:>10} {row['cascade_depth']:>8} "
+                f"{row['depth']:>6} {row['fan_in']:>7} {row['fan_out']:>8}"
+            )
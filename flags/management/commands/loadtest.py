@@ -0,0 +1,80 @@
+import json
+import logging
+import random
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from flags.loadtest import ASGITarget, HTTPTarget, WSGITarget, run_load, seed_graph
+from flags.models import Flag
+
+class Command(BaseCommand):
+    help = 'Seeds a flag graph and replays a production-like request mix against the app'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--flags', type=int, default=1000, help='Number of flags to seed.')
+        parser.add_argument('--max-deps', type=int, default=3, help='Maximum dependencies per seeded flag.')
+        parser.add_argument('--prefix', default='loadtest-', help='Name prefix of the seeded flags.')
+        parser.add_argument('--no-seed', action='store_true', help='Reuse flags already seeded with --prefix.')
+        parser.add_argument('--requests', type=int, default=5000, help='Total number of requests to send.')
+        parser.add_argument('--concurrency', type=int, default=8, help='Number of concurrent clients.')
+        parser.add_argument('--target', choices=['wsgi', 'asgi'], default='wsgi',
+                            help='In-process application to call (core.wsgi or core.asgi).')
+        parser.add_argument('--url', help='Base URL of a running server; overrides --target.')
+        parser.add_argument('--seed', type=int, help='Random seed for a reproducible graph and request plan.')
+        parser.add_argument('--output', default='loadtest-results.json', help='Where to write the JSON report.')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['requests'] < 1:
+            raise CommandError('--requests and --concurrency must be positive.')
+
+        rng = random.Random(options['seed'])
+        if options['no_seed']:
+            rows = list(Flag.objects.filter(name__startswith=options['prefix']).values_list('id', 'name'))
+            if not rows:
+                raise CommandError(f"No flags named '{options['prefix']}*' to reuse.")
+            flag_ids, flag_names = (list(column) for column in zip(*rows))
+        else:
+            self.stdout.write(f"Seeding {options['flags']} flags...")
+            flag_ids, flag_names = seed_graph(options['prefix'], options['flags'], options['max_deps'], rng=rng)
+
+        if options['url']:
+            target = HTTPTarget(options['url'])
+        elif options['target'] == 'asgi':
+            target = ASGITarget()
+        else:
+            target = WSGITarget()
+
+        self.stdout.write(
+            f"Sending {options['requests']} requests to {options['url'] or target.name} "
+            f"with {options['concurrency']} clients..."
+        )
+        # Expected 4xx responses (e.g. blocked toggles) would otherwise flood stderr.
+        request_logger = logging.getLogger('django.request')
+        level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+        try:
+            report = run_load(
+                target, flag_ids, flag_names, options['requests'], options['concurrency'], seed=options['seed']
+            )
+        finally:
+            request_logger.setLevel(level)
+        report['started_at'] = timezone.now().isoformat()
+        report['django_version'] = django.get_version()
+
+        with open(options['output'], 'w') as fh:
+            json.dump(report, fh, indent=2)
+
+        self.stdout.write(f"{'endpoint':<10} {'reqs':>7} {'rps':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7} {'queries':>8}")
+        for name, stats in report['endpoints'].items():
+            self.stdout.write(
+                f"{name:<10} {stats['requests']:>7} {_fmt(stats['throughput_rps']):>9} {_fmt(stats['p50_ms']):>9} "
+                f"{_fmt(stats['p99_ms']):>9} {stats['error_rate']:>7.2%} {_fmt(stats['queries_per_request']):>8}"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['requests']} requests in {report['wall_time_s']}s "
+            f"({report['throughput_rps']} req/s). Report written to {options['output']}"
+        ))
+
+
+def _fmt(value):
+    return '-' if value is None else f'{value:.2f}'
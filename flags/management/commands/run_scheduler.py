@@ -0,0 +1,41 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+from flags.scheduler import apply_due_toggles, next_due_at
+
+class Command(BaseCommand):
+    help = 'Applies scheduled flag toggles as they fall due'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Maximum number of due toggles applied per transaction.')
+        parser.add_argument('--max-sleep', type=float, default=30.0,
+                            help='Upper bound in seconds between checks, so newly scheduled items are picked up.')
+        parser.add_argument('--once', action='store_true',
+                            help='Apply everything currently due and exit.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        max_sleep = options['max_sleep']
+        self.stdout.write('Scheduler started.')
+
+        while True:
+            close_old_connections()
+            items = apply_due_toggles(batch_size=batch_size)
+            for item in items:
+                self.stdout.write(f'#{item.pk} {item.flag_id} -> {item.active}: {item.status} {item.result}')
+
+            if len(items) == batch_size:
+                # There may be more due work; drain it before sleeping.
+                continue
+            if options['once']:
+                break
+
+            due = next_due_at()
+            delay = max_sleep
+            if due is not None:
+                delay = min(max((due - timezone.now()).total_seconds(), 0), max_sleep)
+            time.sleep(delay)
+
+        self.stdout.write(self.style.SUCCESS('Scheduler finished.'))
@@ -1,19 +1,47 @@
 import time
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.db import connections
 from django.db.utils import OperationalError
 
 class Command(BaseCommand):
-    help = 'Waits for the database to be ready'
+    help = 'Waits for every configured database (and its connection pool) to be ready'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--timeout', type=float, default=60.0,
+                            help='Give up after this many seconds.')
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Seconds to wait between attempts.')
 
     def handle(self, *args, **options):
-        self.stdout.write('Waiting for database...')
-        db_conn = None
-        while not db_conn:
-            try:
-                db_conn = connections['default']
-            except OperationalError:
-                self.stdout.write('Database unavailable, waiting 1 second...')
-                time.sleep(1)
+        deadline = time.monotonic() + options['timeout']
+        for alias in connections:
+            self.stdout.write(f'Waiting for database "{alias}"...')
+            while True:
+                try:
+                    self._check(alias, max(deadline - time.monotonic(), 0))
+                    break
+                except Exception as exc:
+                    # Pool timeouts come from psycopg_pool, not Django.
+                    if not isinstance(exc, OperationalError) and type(exc).__name__ != 'PoolTimeout':
+                        raise
+                    connections[alias].close()
+                    if time.monotonic() >= deadline:
+                        raise CommandError(f'Database "{alias}" unavailable: {exc}')
+                    self.stdout.write(f'Database "{alias}" unavailable, waiting {options["interval"]} second(s)...')
+                    time.sleep(options['interval'])
+
+        connections.close_all()
+        self.stdout.write(self.style.SUCCESS('Database available!'))
+
+    def _check(self, alias, timeout):
+        connection = connections[alias]
+        connection.ensure_connection()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
 
-        self.stdout.write(self.style.SUCCESS('Database available!')) 
\ No newline at end of file
+        # Django 5.1+ exposes the psycopg pool when OPTIONS['pool'] is set;
+        # wait until it has opened its minimum number of connections.
+        pool = getattr(connection, 'pool', None)
+        if pool is not None:
+            pool.wait(timeout=timeout)
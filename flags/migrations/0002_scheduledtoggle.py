@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flags', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduledToggle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('active', models.BooleanField()),
+                ('run_at', models.DateTimeField()),
+                ('actor', models.CharField(default='scheduler', max_length=255)),
+                ('reason', models.TextField(blank=True, default='')),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('APPLIED', 'Applied'), ('BLOCKED', 'Blocked'), ('FAILED', 'Failed'), ('CANCELLED', 'Cancelled')], default='PENDING', max_length=20)),
+                ('result', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('applied_at', models.DateTimeField(blank=True, null=True)),
+                ('flag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scheduled_toggles', to='flags.flag')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('status', 'PENDING')), fields=['run_at'], name='sched_pending_run_at_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flags', '0002_scheduledtoggle'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='auditlog',
+            name='action',
+            field=models.CharField(choices=[('CREATE', 'Create'), ('TOGGLE', 'Toggle'), ('AUTO_DISABLE', 'Auto Disable'), ('DEPENDENCY_ADD', 'Dependency Add'), ('DEPENDENCY_REMOVE', 'Dependency Remove')], max_length=255),
+        ),
+    ]
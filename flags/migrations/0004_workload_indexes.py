@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flags', '0003_dependency_audit_actions'),
+    ]
+
+    operations = [
+        # Build the composite indexes before dropping the FK indexes they replace.
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['flag', '-timestamp'], name='audit_flag_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dependency',
+            index=models.Index(fields=['dependency_on', 'flag'], name='dep_parent_child_idx'),
+        ),
+        migrations.AlterField(
+            model_name='auditlog',
+            name='flag',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='audit_logs', to='flags.flag'),
+        ),
+        migrations.AlterField(
+            model_name='dependency',
+            name='dependency_on',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='dependencies_as_parent', to='flags.flag'),
+        ),
+        migrations.AlterField(
+            model_name='dependency',
+            name='flag',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='dependencies_as_child', to='flags.flag'),
+        ),
+    ]
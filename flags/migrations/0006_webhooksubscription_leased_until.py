@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 19:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flags', '0005_webhooks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webhooksubscription',
+            name='leased_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 
 
@@ -15,23 +16,35 @@ class Flag(models.Model):
 
 
 class Dependency(models.Model):
-    flag = models.ForeignKey(Flag, on_delete=models.CASCADE, related_name='dependencies_as_child')
-    dependency_on = models.ForeignKey(Flag, on_delete=models.CASCADE, related_name='dependencies_as_parent')
+    # Both FK columns lead a composite index below, so the default
+    # single-column FK indexes would only add write cost.
+    flag = models.ForeignKey(Flag, on_delete=models.CASCADE, related_name='dependencies_as_child', db_index=False)
+    dependency_on = models.ForeignKey(
+        Flag, on_delete=models.CASCADE, related_name='dependencies_as_parent', db_index=False
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
+        # The unique constraint doubles as the (flag, dependency_on) index used
+        # for parents-of-flag lookups.
         unique_together = ('flag', 'dependency_on')
+        indexes = [
+            # Dependents-of-parent, as walked by cascade_disable.
+            models.Index(fields=['dependency_on', 'flag'], name='dep_parent_child_idx'),
+        ]
 
     def __str__(self):
         return f"{self.flag.name} depends on {self.dependency_on.name}"
         
 
 class AuditLog(models.Model):
-    flag = models.ForeignKey(Flag, on_delete=models.CASCADE, related_name='audit_logs')
+    flag = models.ForeignKey(Flag, on_delete=models.CASCADE, related_name='audit_logs', db_index=False)
     ACTION_CHOICES = [
         ('CREATE', 'Create'),
         ('TOGGLE', 'Toggle'),
         ('AUTO_DISABLE', 'Auto Disable'),
+        ('DEPENDENCY_ADD', 'Dependency Add'),
+        ('DEPENDENCY_REMOVE', 'Dependency Remove'),
     ]
     action = models.CharField(max_length=255, choices=ACTION_CHOICES)
     actor = models.CharField(max_length=255)
@@ -41,5 +54,90 @@ class AuditLog(models.Model):
     old_status = models.BooleanField(default=False)
     new_status = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # Per-flag history, newest first, as served by FlagAuditLogAPIView.
+            models.Index(fields=['flag', '-timestamp'], name='audit_flag_timestamp_idx'),
+        ]
+
     def __str__(self):
         return f"[{self.timestamp}] {self.actor} - {self.action} on {self.flag.name}"
+
+
+class ScheduledToggle(models.Model):
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('APPLIED', 'Applied'),
+        ('BLOCKED', 'Blocked'),
+        ('FAILED', 'Failed'),
+        ('CANCELLED', 'Cancelled'),
+    ]
+    flag = models.ForeignKey(Flag, on_delete=models.CASCADE, related_name='scheduled_toggles')
+    active = models.BooleanField()
+    run_at = models.DateTimeField()
+    actor = models.CharField(max_length=255, default='scheduler')
+    reason = models.TextField(blank=True, default='')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    result = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    applied_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # Only pending rows are ever polled, so keep the index to that set.
+            models.Index(
+                fields=['run_at'],
+                condition=models.Q(status='PENDING'),
+                name='sched_pending_run_at_idx',
+            ),
+        ]
+
+    def __str__(self):
+        state = 'on' if self.active else 'off'
+        return f"{self.flag.name} -> {state} at {self.run_at} ({self.status})"
+
+
+class WebhookSubscription(models.Model):
+    url = models.URLField(max_length=500)
+    secret = models.CharField(max_length=255, blank=True, default='')
+    # Audit actions to forward; empty means all of them.
+    actions = models.JSONField(default=list, blank=True)
+    batch_size = models.PositiveIntegerField(default=100)
+    is_active = models.BooleanField(default=True)
+    # Set while a worker is sending a batch for this subscriber.
+    leased_until = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.url
+
+
+class WebhookEvent(models.Model):
+    """Outbox row: one audit event waiting to be delivered to one subscriber."""
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('DELIVERED', 'Delivered'),
+        ('FAILED', 'Failed'),
+    ]
+    subscription = models.ForeignKey(WebhookSubscription, on_delete=models.CASCADE, related_name='events')
+    audit_log = models.ForeignKey(AuditLog, on_delete=models.CASCADE, related_name='webhook_events')
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # Each subscriber's queue is read head-first, in insertion order.
+            models.Index(
+                fields=['subscription', 'id'],
+                condition=models.Q(status='PENDING'),
+                name='webhook_pending_queue_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.payload.get('action')} on {self.payload.get('flag')} -> {self.subscription.url} ({self.status})"
@@ -0,0 +1,44 @@
+import contextvars
+from contextlib import contextmanager
+from django.conf import settings
+
+_use_replica = contextvars.ContextVar('flags_use_replica', default=False)
+
+
+@contextmanager
+def use_replica():
+    """Send reads made inside this block to the read replica, if one is configured."""
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+class ReadReplicaRouter:
+    """Routes reads to ``settings.FLAGS_READ_REPLICA_ALIAS`` only inside ``use_replica()``.
+
+    Everything else, including every write, stays on ``default`` so
+    read-your-writes holds for the mutating endpoints.
+    """
+
+    def _replica_alias(self):
+        alias = getattr(settings, 'FLAGS_READ_REPLICA_ALIAS', 'replica')
+        return alias if alias in settings.DATABASES else None
+
+    def db_for_read(self, model, **hints):
+        if _use_replica.get():
+            return self._replica_alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same data as default.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == self._replica_alias():
+            return False
+        return None
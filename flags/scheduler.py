@@ -0,0 +1,73 @@
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import Flag, ScheduledToggle
+from .utils import toggle_flag
+
+
+def next_due_at():
+    """Return the ``run_at`` of the earliest pending toggle, or ``None``."""
+    return (
+        ScheduledToggle.objects.filter(status='PENDING')
+        .order_by('run_at')
+        .values_list('run_at', flat=True)
+        .first()
+    )
+
+
+def _lock_due(now, batch_size):
+    qs = ScheduledToggle.objects.filter(status='PENDING', run_at__lte=now).order_by('run_at', 'id')
+    if connection.features.has_select_for_update_skip_locked:
+        # Competing workers each claim a disjoint batch instead of queueing
+        # behind one another's row locks.
+        qs = qs.select_for_update(skip_locked=True)
+    return list(qs[:batch_size])
+
+
+def apply_due_toggles(batch_size=100, now=None):
+    """Apply up to ``batch_size`` due toggles in ``run_at`` order.
+
+    Each item goes through ``toggle_flag`` so dependency checks and
+    ``cascade_disable`` behave exactly as in ``FlagToggleAPIView``. Returns
+    the processed ``ScheduledToggle`` instances.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        items = _lock_due(now, batch_size)
+        if not items:
+            return []
+
+        # Lock the flags in id order before reading their state, so a
+        # competing worker or a toggle request cannot change them underneath.
+        locked = Flag.objects.select_for_update().filter(id__in={item.flag_id for item in items}).order_by('id')
+        flags = {flag.id: flag for flag in locked}
+        for index, item in enumerate(items):
+            flag = flags[item.flag_id]
+            try:
+                with transaction.atomic():
+                    result, missing = toggle_flag(
+                        flag,
+                        item.active,
+                        item.actor,
+                        item.reason or f"Scheduled toggle #{item.pk}",
+                    )
+            except Exception as exc:
+                item.status = 'FAILED'
+                item.result = str(exc)
+                # The savepoint rolled back, so the in-memory flag may be ahead
+                # of the database.
+                flag.refresh_from_db(fields=['is_active'])
+            else:
+                if result == 'blocked':
+                    item.status = 'BLOCKED'
+                    item.result = f"Missing active dependencies: {', '.join(missing)}"
+                else:
+                    item.status = 'APPLIED'
+                    item.result = result
+                if result == 'deactivated':
+                    # The cascade may have switched off flags later in this batch.
+                    remaining = {i.flag_id for i in items[index + 1:]}
+                    flags.update(Flag.objects.in_bulk(remaining))
+            item.applied_at = timezone.now()
+
+        ScheduledToggle.objects.bulk_update(items, ['status', 'result', 'applied_at'])
+    return items
@@ -1,7 +1,7 @@
 from rest_framework import serializers
 from django.db import transaction
 from .utils import _detect_cycle
-from .models import Flag, Dependency, AuditLog
+from .models import Flag, Dependency, AuditLog, ScheduledToggle, WebhookSubscription
 
 
 from rest_framework import serializers
@@ -28,9 +28,9 @@ class FlagCreateSerializer(serializers.ModelSerializer):
         deps = validated_data.pop('dependencies', [])
         with transaction.atomic():
             flag = Flag.objects.create(**validated_data)
+            if _detect_cycle(flag.id, [dep_flag.id for dep_flag in deps]):
+                raise serializers.ValidationError(f"Circular dependency detected for {flag.name}")
             for dep_flag in deps:
-                if _detect_cycle(flag.id, dep_flag.id):
-                    raise serializers.ValidationError(f"Circular dependency detected: {flag.name} -> {dep_flag.name}")
                 Dependency.objects.create(flag=flag, dependency_on=dep_flag)
             AuditLog.objects.create(
                 flag=flag,
@@ -61,15 +61,74 @@ class FlagDetailSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'description', 'is_active', 'dependencies']
 
     def get_dependencies(self, obj):
-        deps = Dependency.objects.filter(flag=obj).select_related('dependency_on')
-        return [d.dependency_on.name for d in deps]
+        # Uses the prefetch from the list/detail querysets when present.
+        return [d.dependency_on.name for d in obj.dependencies_as_child.all()]
+
+
+class DependencyChangeSerializer(serializers.Serializer):
+    dependencies = serializers.ListField(child=serializers.CharField(), allow_empty=False)
+    actor = serializers.CharField(required=False, default='anonymous')
+    reason = serializers.CharField(required=False, default='', allow_blank=True)
+
+    def validate_dependencies(self, value):
+        names = list(dict.fromkeys(value))
+        deps = list(Flag.objects.filter(name__in=names))
+        if len(deps) != len(names):
+            missing = set(names) - {dep.name for dep in deps}
+            raise serializers.ValidationError(f"Flags not found: {missing}")
+        return deps
+
+
+class DependencyEdgeSerializer(serializers.Serializer):
+    flag = serializers.CharField()
+    dependency_on = serializers.CharField()
+
+
+class DependencyBatchSerializer(serializers.Serializer):
+    add = DependencyEdgeSerializer(many=True, required=False, default=list)
+    remove = DependencyEdgeSerializer(many=True, required=False, default=list)
+    actor = serializers.CharField(required=False, default='anonymous')
+    reason = serializers.CharField(required=False, default='', allow_blank=True)
+
+    def validate(self, attrs):
+        if not attrs['add'] and not attrs['remove']:
+            raise serializers.ValidationError("Nothing to add or remove.")
+        for key in ('add', 'remove'):
+            attrs[key] = list({(edge['flag'], edge['dependency_on']): edge for edge in attrs[key]}.values())
+        edges = attrs['add'] + attrs['remove']
+        names = {edge['flag'] for edge in edges} | {edge['dependency_on'] for edge in edges}
+        flags = {flag.name: flag for flag in Flag.objects.filter(name__in=names)}
+        missing = names - set(flags)
+        if missing:
+            raise serializers.ValidationError(f"Flags not found: {missing}")
+        attrs['flags'] = flags
+        return attrs
 
 
 class AuditLogSerializer(serializers.ModelSerializer):
     class Meta:
         model = AuditLog
-        fields = ['id', 'action', 'timestamp', 'actor', 'reason', 'old_status', 'new_status']   
+        fields = ['id', 'action', 'timestamp', 'actor', 'reason', 'old_status', 'new_status']
+
+
+class ScheduledToggleSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ScheduledToggle
+        fields = ['id', 'active', 'run_at', 'actor', 'reason', 'status', 'result', 'created_at', 'applied_at']
+        read_only_fields = ['status', 'result', 'created_at', 'applied_at']
 
 
+class WebhookSubscriptionSerializer(serializers.ModelSerializer):
+    actions = serializers.ListField(
+        child=serializers.ChoiceField(choices=[choice for choice, _ in AuditLog.ACTION_CHOICES]),
+        required=False
+    )
+    pending_events = serializers.SerializerMethodField()
+
+    class Meta:
+        model = WebhookSubscription
+        fields = ['id', 'url', 'secret', 'actions', 'batch_size', 'is_active', 'created_at', 'pending_events']
+        extra_kwargs = {'secret': {'write_only': True}}
 
-        
\ No newline at end of file
+    def get_pending_events(self, obj):
+        return obj.events.filter(status='PENDING').count()
@@ -0,0 +1,70 @@
+import contextvars
+from contextlib import contextmanager
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .models import AuditLog, WebhookEvent, WebhookSubscription
+
+_pending_audit_logs = contextvars.ContextVar('flags_pending_audit_logs', default=None)
+
+
+@contextmanager
+def batched_webhook_events():
+    """Enqueue the webhook events of every audit row created in the block at once.
+
+    Used around multi-row writes such as a toggle and its cascade, so the
+    subscriptions are loaded once instead of once per audit row. The block
+    must run inside the transaction that writes the rows; nothing is
+    enqueued if it raises.
+    """
+    if _pending_audit_logs.get() is not None:
+        yield
+        return
+    pending = []
+    token = _pending_audit_logs.set(pending)
+    try:
+        yield
+    finally:
+        _pending_audit_logs.reset(token)
+    enqueue_webhook_events(pending)
+
+
+@receiver(post_save, sender=AuditLog, dispatch_uid='flags_enqueue_webhook_events')
+def audit_log_created(sender, instance, created, **kwargs):
+    if not created:
+        return
+    pending = _pending_audit_logs.get()
+    if pending is not None:
+        pending.append(instance)
+    else:
+        enqueue_webhook_events([instance])
+
+
+def enqueue_webhook_events(audit_logs):
+    """Write outbox rows for audit events in the same transaction as the events.
+
+    Nothing is sent here; ``deliver_webhooks`` picks the rows up once they
+    are committed, so the request that changed the flag never waits on HTTP.
+    """
+    if not audit_logs:
+        return
+    subscriptions = list(WebhookSubscription.objects.filter(is_active=True))
+    events = []
+    for audit_log in audit_logs:
+        # Toggles are audited as 'toggle', while the choices use upper case.
+        action = audit_log.action.upper()
+        matching = [sub for sub in subscriptions if not sub.actions or action in sub.actions]
+        if not matching:
+            continue
+        payload = {
+            'id': audit_log.id,
+            'flag_id': audit_log.flag_id,
+            'flag': audit_log.flag.name,
+            'action': audit_log.action,
+            'actor': audit_log.actor,
+            'reason': audit_log.reason,
+            'old_status': audit_log.old_status,
+            'new_status': audit_log.new_status,
+            'timestamp': audit_log.timestamp.isoformat(),
+        }
+        events += [WebhookEvent(subscription=sub, audit_log=audit_log, payload=payload) for sub in matching]
+    WebhookEvent.objects.bulk_create(events)
@@ -1 +1,5 @@
- 
\ No newline at end of file
+from django.test.utils import override_settings
+
+# No snapshot threads reading the test database and no snapshot state shared
+# between tests; test_fallback configures the snapshot it exercises.
+override_settings(FLAGS_FALLBACK={'BACKGROUND_REFRESH': False, 'SNAPSHOT_MAX_AGE': None}).enable()
@@ -0,0 +1,29 @@
+from contextlib import contextmanager
+from unittest import mock
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+MARKER = '/* FOR UPDATE */'
+
+
+@contextmanager
+def flag_row_locks():
+    """Collect the ids of the flags selected FOR UPDATE inside the block.
+
+    SQLite has no row locks, so the clause is rendered as a comment and each
+    marked query on the flag table is run again afterwards to see its rows.
+    """
+    locked = set()
+    features = connection.features
+    with mock.patch.object(features, 'has_select_for_update', True), \
+            mock.patch.object(features, 'has_select_for_update_of', True), \
+            mock.patch.object(features, 'has_select_for_update_skip_locked', True), \
+            mock.patch.object(connection.ops, 'for_update_sql', return_value=MARKER), \
+            CaptureQueriesContext(connection) as ctx:
+        yield locked
+    with connection.cursor() as cursor:
+        for query in ctx.captured_queries:
+            sql = query['sql']
+            if MARKER in sql and sql.split(' FROM ', 1)[-1].startswith('"flags_flag"'):
+                cursor.execute(sql)
+                locked.update(row[0] for row in cursor.fetchall())
@@ -0,0 +1,93 @@
+import os
+import runpy
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import CommandError
+from django.db.utils import OperationalError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from ..models import Flag
+from ..routers import ReadReplicaRouter, use_replica
+
+REPLICA_DATABASES = {
+    'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'},
+    'replica': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'},
+}
+
+
+class ReadReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReadReplicaRouter()
+
+    def test_reads_stay_on_default_outside_use_replica(self):
+        with override_settings(DATABASES=REPLICA_DATABASES):
+            self.assertIsNone(self.router.db_for_read(Flag))
+
+    def test_reads_go_to_replica_inside_use_replica(self):
+        with override_settings(DATABASES=REPLICA_DATABASES), use_replica():
+            self.assertEqual(self.router.db_for_read(Flag), 'replica')
+            self.assertIsNone(self.router.db_for_write(Flag))
+
+    def test_no_replica_configured(self):
+        with use_replica():
+            self.assertIsNone(self.router.db_for_read(Flag))
+
+    def test_replica_is_never_migrated(self):
+        with override_settings(DATABASES=REPLICA_DATABASES):
+            self.assertFalse(self.router.allow_migrate('replica', 'flags'))
+            self.assertIsNone(self.router.allow_migrate('default', 'flags'))
+
+
+class ReadReplicaViewTests(TestCase):
+    def test_only_safe_methods_use_replica(self):
+        seen = []
+        original = ReadReplicaRouter.db_for_read
+
+        def spy(router, model, **hints):
+            from ..routers import _use_replica
+            seen.append(_use_replica.get())
+            return original(router, model, **hints)
+
+        flag = Flag.objects.create(name='a')
+        client = APIClient()
+        with mock.patch.object(ReadReplicaRouter, 'db_for_read', spy):
+            client.get(reverse('flag-detail', args=[flag.id]))
+            self.assertTrue(seen and all(seen))
+            seen.clear()
+            client.patch(reverse('flag-toggle', args=[flag.id]), {'active': True}, format='json')
+            self.assertTrue(seen and not any(seen))
+
+
+class PoolSettingsTests(SimpleTestCase):
+    def test_pool_requires_a_supporting_stack(self):
+        env = {'USE_POSTGRES': 'True', 'DB_POOL': 'True'}
+        with mock.patch.dict(os.environ, env), mock.patch('django.VERSION', (4, 2, 0, 'final', 0)):
+            with self.assertRaisesMessage(ImproperlyConfigured, 'Django 5.1'):
+                runpy.run_path(str(settings.BASE_DIR / 'core' / 'settings.py'))
+
+
+class WaitForDbTests(SimpleTestCase):
+    check = 'flags.management.commands.wait_for_db.Command._check'
+
+    def test_retries_until_database_answers(self):
+        side_effect = [OperationalError('down'), OperationalError('down'), None]
+        with mock.patch(self.check, side_effect=side_effect) as check, mock.patch('time.sleep') as sleep:
+            out = StringIO()
+            call_command('wait_for_db', '--interval', '0', stdout=out)
+        self.assertEqual(check.call_count, 3)
+        self.assertEqual(sleep.call_count, 2)
+        self.assertIn('Database available!', out.getvalue())
+
+    def test_gives_up_after_timeout(self):
+        with mock.patch(self.check, side_effect=OperationalError('down')), mock.patch('time.sleep'):
+            with self.assertRaises(CommandError):
+                call_command('wait_for_db', '--timeout', '0', stdout=StringIO())
+
+    def test_other_errors_are_not_swallowed(self):
+        with mock.patch(self.check, side_effect=ValueError('bad settings')):
+            with self.assertRaises(ValueError):
+                call_command('wait_for_db', stdout=StringIO())
@@ -0,0 +1,104 @@
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from ..models import Flag, Dependency, AuditLog
+from ..utils import _detect_cycle
+from .locks import flag_row_locks
+
+
+class DependencyEdgeTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.a = Flag.objects.create(name='a', is_active=True)
+        self.b = Flag.objects.create(name='b', is_active=True)
+        self.c = Flag.objects.create(name='c', is_active=False)
+        # b depends on a
+        Dependency.objects.create(flag=self.b, dependency_on=self.a)
+
+    def test_detect_cycle_walks_transitive_parents(self):
+        Dependency.objects.create(flag=self.c, dependency_on=self.b)
+        self.assertTrue(_detect_cycle(self.a.id, [self.c.id]))
+        self.assertTrue(_detect_cycle(self.a.id, [self.a.id]))
+        self.assertFalse(_detect_cycle(self.c.id, [self.a.id]))
+
+    def test_add_and_remove_by_name(self):
+        url = reverse('flag-dependencies', args=[self.c.id])
+        response = self.client.post(url, {'dependencies': ['a', 'b'], 'actor': 'ops'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['dependencies'], ['a', 'b'])
+
+        response = self.client.delete(url, {'dependencies': ['a'], 'actor': 'ops'}, format='json')
+        self.assertEqual(response.data['removed'], ['a'])
+        self.assertEqual(response.data['dependencies'], ['b'])
+
+        actions = list(AuditLog.objects.filter(flag=self.c).order_by('id').values_list('action', flat=True))
+        self.assertEqual(actions, ['DEPENDENCY_ADD', 'DEPENDENCY_ADD', 'DEPENDENCY_REMOVE'])
+
+    def test_add_rejects_cycle(self):
+        url = reverse('flag-dependency-edge', args=[self.a.id, self.b.id])
+        response = self.client.put(url, {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Dependency.objects.filter(flag=self.a).exists())
+
+    def test_active_flag_cannot_depend_on_inactive_flag(self):
+        url = reverse('flag-dependency-edge', args=[self.a.id, self.c.id])
+        response = self.client.put(url, {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['missing_dependencies'], ['c'])
+
+    def test_remove_single_edge(self):
+        url = reverse('flag-dependency-edge', args=[self.b.id, self.a.id])
+        self.assertEqual(self.client.delete(url).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.delete(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_adding_edges_locks_flag_and_new_parents(self):
+        d = Flag.objects.create(name='d')
+        with flag_row_locks() as locked:
+            self.client.put(reverse('flag-dependency-edge', args=[self.c.id, self.a.id]))
+        self.assertEqual(locked, {self.a.id, self.c.id})
+
+        url = reverse('flag-dependencies', args=[d.id])
+        with flag_row_locks() as locked:
+            self.client.post(url, {'dependencies': ['b', 'c']}, format='json')
+        self.assertEqual(locked, {self.b.id, self.c.id, d.id})
+
+    def test_add_single_edge_to_missing_parent(self):
+        url = reverse('flag-dependency-edge', args=[self.c.id, 999])
+        self.assertEqual(self.client.put(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_batch_checks_edges_added_earlier_in_batch(self):
+        url = reverse('dependency-batch')
+        data = {'add': [
+            {'flag': 'c', 'dependency_on': 'b'},
+            {'flag': 'a', 'dependency_on': 'c'},
+        ]}
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        self.a.is_active = False
+        self.a.save()
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['edge'], {'flag': 'a', 'dependency_on': 'c'})
+        self.assertFalse(Dependency.objects.filter(flag=self.c).exists())
+
+    def test_batch_remove_then_add(self):
+        url = reverse('dependency-batch')
+        data = {
+            'remove': [{'flag': 'b', 'dependency_on': 'a'}],
+            'add': [{'flag': 'a', 'dependency_on': 'b'}],
+        }
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['added'], [{'flag': 'a', 'dependency_on': 'b'}])
+        self.assertTrue(Dependency.objects.filter(flag=self.a, dependency_on=self.b).exists())
+        self.assertFalse(Dependency.objects.filter(flag=self.b).exists())
+
+    def test_batch_ignores_repeated_edges(self):
+        url = reverse('dependency-batch')
+        data = {'add': [{'flag': 'c', 'dependency_on': 'a'}, {'flag': 'c', 'dependency_on': 'a'}]}
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['added'], [{'flag': 'c', 'dependency_on': 'a'}])
+        self.assertEqual(AuditLog.objects.filter(flag=self.c, action='DEPENDENCY_ADD').count(), 1)
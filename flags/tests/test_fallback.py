@@ -0,0 +1,172 @@
+import json
+import os
+import runpy
+import tempfile
+import threading
+import time
+from unittest import mock
+from django.conf import settings
+from django.db.utils import OperationalError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from ..fallback import DEFAULTS, SnapshotStore, get_snapshot_store, latency_budget, reset_snapshot_store
+from ..models import Flag, Dependency
+
+FALLBACK = {'BACKGROUND_REFRESH': False, 'SNAPSHOT_MAX_AGE': 3600, 'LATENCY_BUDGET_MS': 250}
+
+
+def database_down():
+    return mock.patch(
+        'flags.fallback.latency_budget',
+        side_effect=OperationalError('could not connect to server'),
+    )
+
+
+@override_settings(FLAGS_FALLBACK=FALLBACK)
+class StaleFallbackTests(TestCase):
+    def setUp(self):
+        reset_snapshot_store()
+        self.addCleanup(reset_snapshot_store)
+        self.client = APIClient()
+        self.url = reverse('flag-list-create')
+        self.a = Flag.objects.create(name='a', is_active=True)
+        self.b = Flag.objects.create(name='b', description='second')
+        Dependency.objects.create(flag=self.b, dependency_on=self.a)
+
+    def test_fresh_read_takes_snapshot(self):
+        response = self.client.get(self.url)
+        self.assertNotIn('X-Flags-Stale', response)
+        store = get_snapshot_store()
+        self.assertEqual(store.rows[self.b.id]['dependencies'], ['a'])
+        self.assertEqual(store.snapshot_metrics()['fresh'], 1)
+
+    def test_stale_list_matches_fresh_shape(self):
+        fresh = self.client.get(self.url).json()
+        with database_down():
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Flags-Stale'], 'true')
+        self.assertIn('110', response['Warning'])
+        self.assertEqual(response.json(), fresh)
+
+    def test_stale_state_and_sparse_views(self):
+        self.client.get(self.url)
+        with database_down():
+            state = self.client.get(self.url, {'view': 'state'})
+            sparse = self.client.get(self.url, {'fields': 'name,dependencies'})
+        self.assertEqual(state.json(), {'a': True, 'b': False})
+        self.assertEqual(sparse.json()['results'][1], {'name': 'b', 'dependencies': ['a']})
+
+    def test_stale_detail(self):
+        self.client.get(self.url)
+        with database_down():
+            response = self.client.get(reverse('flag-detail', args=[self.b.id]))
+            missing = self.client.get(reverse('flag-detail', args=[999]))
+        self.assertEqual(response['X-Flags-Stale'], 'true')
+        self.assertEqual(response.json()['dependencies'], ['a'])
+        self.assertEqual(missing.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_error_without_snapshot_propagates(self):
+        with database_down(), self.assertRaises(OperationalError):
+            self.client.get(self.url)
+
+    def test_degraded_store_skips_database_until_recovered(self):
+        self.client.get(self.url)
+        store = get_snapshot_store()
+        with mock.patch.object(store, 'refresh_async'):
+            with database_down():
+                self.client.get(self.url)
+            self.assertTrue(store.degraded)
+            # While degraded the snapshot is served without touching the database.
+            with self.assertNumQueries(0):
+                response = self.client.get(self.url)
+            self.assertEqual(response['X-Flags-Stale'], 'true')
+
+        store.refresh()
+        self.assertFalse(store.degraded)
+        self.assertNotIn('X-Flags-Stale', self.client.get(self.url))
+
+    def test_metrics_endpoint(self):
+        self.client.get(self.url)
+        with database_down():
+            self.client.get(self.url)
+        metrics = self.client.get(reverse('fallback-metrics')).json()
+        self.assertEqual(metrics['fresh'], 1)
+        self.assertEqual(metrics['stale_served'], 1)
+        self.assertEqual(metrics['db_errors'], 1)
+        self.assertEqual(metrics['snapshot_flags'], 2)
+
+    def test_latency_budget_interrupts_slow_query(self):
+        from django.db import connection
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            self.skipTest('No latency budget for this backend.')
+        slow = (
+            "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 100000000) "
+            "SELECT count(*) FROM n"
+        )
+        with self.assertRaises(OperationalError):
+            with latency_budget('default', 10):
+                with connection.cursor() as cursor:
+                    cursor.execute(slow)
+
+    def test_snapshot_persists_to_disk(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'flags.json')
+            with override_settings(FLAGS_FALLBACK={**FALLBACK, 'SNAPSHOT_PATH': path}):
+                reset_snapshot_store()
+                get_snapshot_store().refresh()
+                with open(path) as fh:
+                    self.assertEqual(len(json.load(fh)['flags']), 2)
+
+                # A new process starts with the snapshot already loaded.
+                reset_snapshot_store()
+                with database_down():
+                    response = self.client.get(self.url, {'view': 'state'})
+        self.assertEqual(response['X-Flags-Stale'], 'true')
+        self.assertEqual(response.json(), {'a': True, 'b': False})
+
+
+class BackgroundRecoveryTests(SimpleTestCase):
+    def test_refresh_running_at_outage_keeps_retrying(self):
+        store = SnapshotStore({**DEFAULTS, 'BACKGROUND_REFRESH': True, 'RETRY_INTERVAL': 0})
+        outage = threading.Event()
+        attempts = []
+
+        def refresh():
+            attempts.append(1)
+            if len(attempts) == 1:
+                outage.wait(5)
+                raise OperationalError('could not connect to server')
+            with store._lock:
+                store.taken_at = time.time()
+                store.degraded = False
+
+        with mock.patch.object(store, 'refresh', refresh), mock.patch('flags.fallback.connections'):
+            # An age-based refresh is in flight when the database goes down.
+            store.refresh_async()
+            store.mark_degraded()
+            outage.set()
+            deadline = time.monotonic() + 5
+            while store._refreshing and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+        self.assertEqual(len(attempts), 2)
+        self.assertFalse(store.degraded)
+        self.assertFalse(store._refreshing)
+
+
+class SessionBudgetTests(SimpleTestCase):
+    def test_replica_sets_the_budget_per_connection(self):
+        env = {'USE_POSTGRES': 'True', 'DB_REPLICA_HOST': 'replica', 'FLAGS_LATENCY_BUDGET_MS': '120'}
+        with mock.patch.dict(os.environ, env):
+            databases = runpy.run_path(str(settings.BASE_DIR / 'core' / 'settings.py'))['DATABASES']
+        self.assertEqual(databases['replica']['OPTIONS']['options'], '-c statement_timeout=120')
+        self.assertNotIn('options', databases['default']['OPTIONS'])
+
+    def test_no_round_trips_when_the_session_has_the_budget(self):
+        connection = mock.Mock(vendor='postgresql', settings_dict={'OPTIONS': {'options': '-c statement_timeout=250'}})
+        with mock.patch('flags.fallback.connections', {'replica': connection}):
+            with latency_budget('replica', 250):
+                pass
+        connection.cursor.assert_not_called()
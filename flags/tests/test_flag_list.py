@@ -0,0 +1,67 @@
+import json
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from ..models import Flag, Dependency
+from ..renderers import FastJSONRenderer
+
+
+class FlagListTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('flag-list-create')
+        self.a = Flag.objects.create(name='a', description='first', is_active=True)
+        self.b = Flag.objects.create(name='b', description='second')
+        Dependency.objects.create(flag=self.b, dependency_on=self.a)
+
+    def test_default_representation_is_unchanged(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['results'][1], {
+            'id': self.b.id, 'name': 'b', 'description': 'second', 'is_active': False, 'dependencies': ['a'],
+        })
+
+    def test_default_representation_does_not_query_per_flag(self):
+        for i in range(10):
+            Flag.objects.create(name=f'extra{i}')
+        # count, flags, prefetched dependencies
+        with self.assertNumQueries(3):
+            self.client.get(self.url)
+
+    def test_sparse_fields(self):
+        response = self.client.get(self.url, {'fields': 'name,is_active'})
+        self.assertEqual(response.json()['results'], [
+            {'name': 'a', 'is_active': True},
+            {'name': 'b', 'is_active': False},
+        ])
+
+    def test_sparse_fields_with_dependencies(self):
+        response = self.client.get(self.url, {'fields': 'name,dependencies'})
+        self.assertEqual(response.json()['results'], [
+            {'name': 'a', 'dependencies': []},
+            {'name': 'b', 'dependencies': ['a']},
+        ])
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get(self.url, {'fields': 'name,secret'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_state_view_is_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'view': 'state'})
+        self.assertEqual(response.json(), {'a': True, 'b': False})
+
+    def test_fast_renderer_matches_stock_json(self):
+        data = {'name': 'café', 'sep': '\u2028', 'created_at': self.a.created_at, 'n': [1, None]}
+        rendered = FastJSONRenderer().render(data)
+        self.assertIn(b'\\u2028', rendered)
+        decoded = json.loads(rendered)
+        self.assertEqual(decoded['name'], 'café')
+        self.assertTrue(decoded['created_at'].endswith('Z'))
+
+    def test_list_item_errors_render(self):
+        # DRF keys ListField item errors by index, which is not a string.
+        response = self.client.post(self.url, {'name': 'x', 'dependencies': [None]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('0', response.json()['dependencies'])
@@ -0,0 +1,116 @@
+import json
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from ..graph import analyze_graph, get_graph_report
+from ..models import Flag, Dependency
+
+
+class AnalyzeGraphTests(SimpleTestCase):
+    def by_name(self, report):
+        return {row['name']: row for row in report['stats']}
+
+    def test_diamond_counts_shared_dependents_once(self):
+        # root -> left, right -> leaf
+        nodes = [(1, 'root'), (2, 'left'), (3, 'right'), (4, 'leaf')]
+        edges = [(1, 2), (1, 3), (2, 4), (3, 4)]
+        report = analyze_graph(nodes, edges)
+        stats = self.by_name(report)
+
+        self.assertEqual(stats['root']['transitive_dependents'], 3)
+        self.assertEqual(stats['left']['transitive_dependents'], 1)
+        self.assertEqual(stats['leaf']['transitive_dependents'], 0)
+        self.assertEqual(stats['root']['cascade_depth'], 2)
+        self.assertEqual(stats['leaf']['depth'], 2)
+        self.assertEqual(stats['root']['fan_out'], 2)
+        self.assertEqual(stats['leaf']['fan_in'], 2)
+        self.assertEqual(report['max_depth'], 2)
+        self.assertEqual(report['cycles'], [])
+
+    def test_edges_of_unknown_flags_are_skipped(self):
+        report = analyze_graph([(1, 'a'), (2, 'b')], [(1, 2), (1, 3), (4, 2)])
+        self.assertEqual(report['edges'], 1)
+        self.assertEqual(self.by_name(report)['a']['fan_out'], 1)
+
+    def test_cycles_are_reported_and_terminate(self):
+        nodes = [(1, 'a'), (2, 'b'), (3, 'c'), (4, 'd')]
+        edges = [(1, 2), (2, 3), (3, 1), (3, 4)]
+        report = analyze_graph(nodes, edges)
+        stats = self.by_name(report)
+
+        self.assertEqual(report['cycles'], [['a', 'b', 'c']])
+        self.assertEqual(stats['a']['transitive_dependents'], 3)
+        self.assertEqual(stats['d']['transitive_dependents'], 0)
+        self.assertEqual(stats['a']['cascade_depth'], 1)
+
+    def test_matches_brute_force_on_random_dag(self):
+        import random
+        rng = random.Random(5)
+        nodes = [(i, f'f{i}') for i in range(200)]
+        edges = {(rng.randrange(i), i) for i in range(1, 200) for _ in range(rng.randint(0, 3))}
+        stats = self.by_name(analyze_graph(nodes, edges))
+
+        children = {i: [c for p, c in edges if p == i] for i, _ in nodes}
+        for pk, name in nodes:
+            seen, stack = set(), [pk]
+            while stack:
+                for child in children[stack.pop()]:
+                    if child not in seen:
+                        seen.add(child)
+                        stack.append(child)
+            self.assertEqual(stats[name]['transitive_dependents'], len(seen))
+
+
+class GraphReportTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.dict('flags.graph._cached', clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        root = Flag.objects.create(name='root')
+        for i in range(3):
+            child = Flag.objects.create(name=f'child{i}')
+            Dependency.objects.create(flag=child, dependency_on=root)
+
+    def test_endpoint_reports_hotspots(self):
+        response = self.client.get(reverse('flag-graph'), {'top': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['hotspots'][0]['name'], 'root')
+        self.assertEqual(response.data['hotspots'][0]['transitive_dependents'], 3)
+        self.assertEqual(len(response.data['hotspots']), 2)
+        self.assertNotIn('stats', response.data)
+
+        response = self.client.get(reverse('flag-graph'), {'all': 'true'})
+        self.assertEqual(len(response.data['stats']), 4)
+
+    def test_invalid_top(self):
+        response = self.client.get(reverse('flag-graph'), {'top': 'lots'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cached_until_graph_changes(self):
+        first = get_graph_report()
+        self.assertFalse(first['cached'])
+        # Toggles do not change the graph.
+        Flag.objects.filter(name='root').update(is_active=True)
+        self.assertTrue(get_graph_report()['cached'])
+
+        Dependency.objects.create(flag=Flag.objects.get(name='child1'), dependency_on=Flag.objects.get(name='child0'))
+        report = get_graph_report()
+        self.assertFalse(report['cached'])
+        self.assertEqual(report['max_cascade_depth'], 2)
+
+        Dependency.objects.filter(flag__name='child1', dependency_on__name='child0').delete()
+        self.assertFalse(get_graph_report()['cached'])
+
+    def test_command(self):
+        out = StringIO()
+        call_command('graph_report', '--top', '1', stdout=out)
+        self.assertIn('4 flags, 3 dependencies', out.getvalue())
+
+        out = StringIO()
+        call_command('graph_report', '--json', stdout=out)
+        self.assertEqual(json.loads(out.getvalue())['hotspots'][0]['name'], 'root')
@@ -0,0 +1,36 @@
+from django.db import connection
+from django.test import TestCase
+from ..models import Flag, Dependency, AuditLog
+
+
+class QueryPlanTests(TestCase):
+    """The hot lookups must be answered from the indexes added for them."""
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            # Tiny test tables would otherwise always be sequentially scanned.
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+        parent = Flag.objects.create(name='parent', is_active=True)
+        child = Flag.objects.create(name='child')
+        Dependency.objects.create(flag=child, dependency_on=parent)
+        AuditLog.objects.create(flag=child, action='CREATE', actor='system', reason='Flag created')
+        self.parent, self.child = parent, child
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+        self.assertNotRegex(plan, r'(?m)SCAN (TABLE )?flags_\w+\s*$|Seq Scan')
+
+    def test_dependents_by_parent(self):
+        qs = Dependency.objects.filter(dependency_on_id=self.parent.id).values_list('flag_id', flat=True)
+        self.assertUsesIndex(qs, 'dep_parent_child_idx')
+
+    def test_parents_by_flag(self):
+        qs = Dependency.objects.filter(flag_id=self.child.id).values_list('dependency_on_id', flat=True)
+        self.assertUsesIndex(qs, 'flag_id_dependency_on_id')
+
+    def test_audit_by_flag_by_time(self):
+        qs = AuditLog.objects.filter(flag_id=self.child.id).order_by('-timestamp')
+        self.assertUsesIndex(qs, 'audit_flag_timestamp_idx')
+        self.assertNotIn('TEMP B-TREE', qs.explain())
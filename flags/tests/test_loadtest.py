@@ -0,0 +1,41 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from django.core.management import call_command
+from django.test import TransactionTestCase
+from ..loadtest import TRAFFIC_MIX, _percentile, seed_graph
+from ..models import Flag, Dependency
+
+
+class LoadTestCommandTests(TransactionTestCase):
+    def test_seeds_graph_and_writes_report(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, 'report.json')
+            call_command(
+                'loadtest', '--flags', '30', '--requests', '60', '--concurrency', '1',
+                '--seed', '7', '--output', output, stdout=StringIO(),
+            )
+            with open(output) as fh:
+                report = json.load(fh)
+
+        self.assertGreaterEqual(Flag.objects.filter(name__startswith='loadtest-').count(), 30)
+        self.assertTrue(Dependency.objects.exists())
+        self.assertEqual(report['requests'], 60)
+        self.assertEqual(set(report['endpoints']), set(TRAFFIC_MIX))
+        evaluate = report['endpoints']['evaluate']
+        self.assertEqual(evaluate['error_rate'], 0.0)
+        self.assertEqual(evaluate['queries_per_request'], 1.0)
+        self.assertIsNotNone(evaluate['p99_ms'])
+
+    def test_seeded_active_flags_have_active_parents(self):
+        seed_graph('g-', 50, 3)
+        self.assertFalse(
+            Dependency.objects.filter(flag__is_active=True, dependency_on__is_active=False).exists()
+        )
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(_percentile(values, 50), 50)
+        self.assertEqual(_percentile(values, 99), 99)
+        self.assertIsNone(_percentile([], 50))
@@ -0,0 +1,93 @@
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from ..models import Flag, Dependency, AuditLog, ScheduledToggle
+from ..scheduler import apply_due_toggles, next_due_at
+from .locks import flag_row_locks
+
+
+class ScheduledToggleTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.parent = Flag.objects.create(name='parent', is_active=True)
+        self.child = Flag.objects.create(name='child', is_active=True)
+        Dependency.objects.create(flag=self.child, dependency_on=self.parent)
+        self.past = timezone.now() - timedelta(minutes=1)
+
+    def test_schedule_via_api(self):
+        url = reverse('flag-schedule', args=[self.parent.id])
+        run_at = timezone.now() + timedelta(hours=1)
+        response = self.client.post(url, {'active': False, 'run_at': run_at.isoformat(), 'actor': 'ops'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['status'], 'PENDING')
+
+        response = self.client.get(url)
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(next_due_at(), ScheduledToggle.objects.get().run_at)
+
+    def test_future_items_are_not_applied(self):
+        ScheduledToggle.objects.create(flag=self.parent, active=False, run_at=timezone.now() + timedelta(hours=1))
+        self.assertEqual(apply_due_toggles(), [])
+        self.parent.refresh_from_db()
+        self.assertTrue(self.parent.is_active)
+
+    def test_due_disable_cascades(self):
+        item = ScheduledToggle.objects.create(flag=self.parent, active=False, run_at=self.past, actor='ops', reason='launch over')
+        apply_due_toggles()
+
+        item.refresh_from_db()
+        self.child.refresh_from_db()
+        self.assertEqual(item.status, 'APPLIED')
+        self.assertEqual(item.result, 'deactivated')
+        self.assertIsNotNone(item.applied_at)
+        self.assertFalse(self.child.is_active)
+        self.assertTrue(AuditLog.objects.filter(flag=self.child, action='AUTO_DISABLE').exists())
+        self.assertEqual(AuditLog.objects.get(flag=self.parent).actor, 'ops')
+
+    def test_batch_sees_cascade_from_earlier_item(self):
+        ScheduledToggle.objects.create(flag=self.parent, active=False, run_at=self.past - timedelta(seconds=1))
+        later = ScheduledToggle.objects.create(flag=self.child, active=True, run_at=self.past)
+        apply_due_toggles()
+
+        later.refresh_from_db()
+        self.assertEqual(later.status, 'BLOCKED')
+        self.assertIn('parent', later.result)
+
+    def test_flags_and_checked_parents_are_locked(self):
+        self.child.is_active = False
+        self.child.save()
+        other = Flag.objects.create(name='other', is_active=True)
+        ScheduledToggle.objects.create(flag=self.child, active=True, run_at=self.past)
+        ScheduledToggle.objects.create(flag=other, active=False, run_at=self.past)
+        with flag_row_locks() as locked:
+            apply_due_toggles()
+        self.assertEqual(locked, {self.parent.id, self.child.id, other.id})
+
+    def test_toggle_endpoint_locks_flag_and_parents(self):
+        self.child.is_active = False
+        self.child.save()
+        url = reverse('flag-toggle', args=[self.child.id])
+        with flag_row_locks() as locked:
+            response = self.client.patch(url, {'active': True}, format='json')
+        self.assertEqual(response.data['status'], 'activated')
+        self.assertEqual(locked, {self.parent.id, self.child.id})
+
+    def test_cancel(self):
+        item = ScheduledToggle.objects.create(flag=self.parent, active=False, run_at=self.past)
+        url = reverse('flag-schedule-cancel', args=[self.parent.id, item.id])
+        self.assertEqual(self.client.delete(url).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.delete(url).status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(apply_due_toggles(), [])
+
+    def test_run_scheduler_once_drains_batches(self):
+        for i in range(5):
+            flag = Flag.objects.create(name=f'f{i}')
+            ScheduledToggle.objects.create(flag=flag, active=True, run_at=self.past)
+        call_command('run_scheduler', '--once', '--batch-size', '2', stdout=StringIO())
+        self.assertFalse(ScheduledToggle.objects.filter(status='PENDING').exists())
+        self.assertEqual(Flag.objects.filter(name__startswith='f', is_active=True).count(), 5)
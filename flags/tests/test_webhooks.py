@@ -0,0 +1,230 @@
+import json
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from ..models import Flag, Dependency, AuditLog, WebhookEvent, WebhookSubscription
+from ..webhooks import deliver_pending, deliver_subscription, post_batch, sign
+
+OPTIONS = {'TIMEOUT': 5, 'MAX_ATTEMPTS': 3, 'BACKOFF_BASE': 2, 'BACKOFF_MAX': 600, 'LEASE': 60}
+
+
+class StubReceiver:
+    """Local HTTP endpoint that records delivered batches and can be told to fail."""
+
+    def __init__(self):
+        self.batches = []
+        self.headers = []
+        self.fail_next = 0
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                if receiver.fail_next:
+                    receiver.fail_next -= 1
+                    self.send_response(503)
+                else:
+                    receiver.batches.append(json.loads(body)['events'])
+                    receiver.headers.append((dict(self.headers), body))
+                    self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/hook'
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    @property
+    def events(self):
+        return [event for batch in self.batches for event in batch]
+
+
+class WebhookTests(TestCase):
+    def setUp(self):
+        self.receiver = StubReceiver()
+        self.addCleanup(self.receiver.stop)
+        self.client = APIClient()
+        self.subscription = WebhookSubscription.objects.create(url=self.receiver.url, batch_size=2)
+        self.parent = Flag.objects.create(name='parent', is_active=True)
+        self.child = Flag.objects.create(name='child', is_active=True)
+        Dependency.objects.create(flag=self.child, dependency_on=self.parent)
+
+    def toggle(self, flag, active):
+        url = reverse('flag-toggle', args=[flag.id])
+        return self.client.patch(url, {'active': active, 'actor': 'ops'}, format='json')
+
+    def test_toggle_only_writes_outbox_rows(self):
+        self.toggle(self.parent, False)
+        self.assertEqual(self.receiver.batches, [])
+        actions = list(WebhookEvent.objects.order_by('id').values_list('payload__action', flat=True))
+        self.assertEqual(actions, ['toggle', 'AUTO_DISABLE'])
+
+    def test_cascade_loads_subscriptions_once(self):
+        for i in range(5):
+            flag = Flag.objects.create(name=f'dependent{i}', is_active=True)
+            Dependency.objects.create(flag=flag, dependency_on=self.child)
+        with CaptureQueriesContext(connection) as ctx:
+            self.toggle(self.parent, False)
+        lookups = [q for q in ctx.captured_queries if 'FROM "flags_webhooksubscription"' in q['sql']]
+        self.assertEqual(len(lookups), 1)
+        self.assertEqual(WebhookEvent.objects.count(), 7)
+
+    def test_action_filter(self):
+        WebhookSubscription.objects.create(url=self.receiver.url, actions=['AUTO_DISABLE'])
+        self.toggle(self.parent, False)
+        self.assertEqual(WebhookEvent.objects.count(), 3)
+
+    def test_batched_delivery_in_order(self):
+        self.toggle(self.parent, False)
+        self.toggle(self.parent, True)
+        self.toggle(self.child, True)
+        totals = deliver_pending(options=OPTIONS)
+
+        self.assertEqual(totals, {'delivered': 4, 'failed': 0, 'batches': 2})
+        self.assertEqual([len(batch) for batch in self.receiver.batches], [2, 2])
+        child_events = [(e['action'], e['new_status']) for e in self.receiver.events if e['flag'] == 'child']
+        self.assertEqual(child_events, [('AUTO_DISABLE', False), ('toggle', True)])
+        self.assertFalse(WebhookEvent.objects.filter(status='PENDING').exists())
+
+    def test_failed_batch_is_retried_with_backoff(self):
+        self.toggle(self.parent, False)
+        self.receiver.fail_next = 1
+        now = timezone.now()
+
+        self.assertEqual(deliver_pending(now=now, options=OPTIONS)['delivered'], 0)
+        event = WebhookEvent.objects.order_by('id').first()
+        self.assertEqual(event.attempts, 1)
+        self.assertEqual(event.last_error, 'HTTP 503')
+        self.assertGreater(event.next_attempt_at, now)
+
+        # Later events queue behind the failed head instead of overtaking it.
+        self.toggle(self.child, True)
+        self.assertEqual(deliver_pending(now=now, options=OPTIONS)['delivered'], 0)
+
+        later = event.next_attempt_at
+        self.assertEqual(deliver_pending(now=later, options=OPTIONS)['delivered'], 2)
+        self.assertEqual(deliver_pending(now=later, options=OPTIONS)['delivered'], 0)
+        self.assertEqual([e['action'] for e in self.receiver.events], ['toggle', 'AUTO_DISABLE'])
+
+    def test_gives_up_after_max_attempts(self):
+        self.toggle(self.parent, False)
+        self.receiver.fail_next = OPTIONS['MAX_ATTEMPTS']
+        when = timezone.now()
+        for _ in range(OPTIONS['MAX_ATTEMPTS']):
+            deliver_pending(now=when, options=OPTIONS)
+            when += timedelta(seconds=OPTIONS['BACKOFF_MAX'])
+        self.assertEqual(WebhookEvent.objects.filter(status='FAILED').count(), 2)
+
+    def test_later_events_get_their_own_attempts(self):
+        options = {**OPTIONS, 'MAX_ATTEMPTS': 2}
+        self.subscription.batch_size = 3
+        self.subscription.save()
+        self.toggle(self.parent, False)
+        self.receiver.fail_next = 2
+        clock = [timezone.now()]
+        with mock.patch('flags.webhooks.timezone.now', lambda: clock[0]):
+            deliver_pending(options=options)
+
+            AuditLog.objects.create(flag=self.parent, action='CREATE', actor='system', reason='late')
+            clock[0] += timedelta(seconds=OPTIONS['BACKOFF_MAX'])
+            self.assertEqual(deliver_pending(options=options)['failed'], 2)
+            late = WebhookEvent.objects.get(payload__reason='late')
+            self.assertEqual((late.status, late.attempts), ('PENDING', 1))
+
+            clock[0] += timedelta(seconds=OPTIONS['BACKOFF_MAX'])
+            deliver_pending(options=options)
+        self.assertEqual([e['reason'] for e in self.receiver.events], ['late'])
+
+    def test_batch_is_sent_outside_the_claiming_transaction(self):
+        self.toggle(self.parent, False)
+        depth = len(connection.atomic_blocks)
+        seen = []
+
+        def send(subscription, payloads, timeout):
+            seen.append(len(connection.atomic_blocks))
+            # The subscriber is leased, so a competing worker finds nothing to do.
+            seen.append(deliver_subscription(subscription.id, options=OPTIONS))
+            return post_batch(subscription, payloads, timeout)
+
+        with mock.patch('flags.webhooks.post_batch', send):
+            self.assertEqual(deliver_pending(options=OPTIONS)['delivered'], 2)
+        self.assertEqual(seen, [depth, (0, 0)])
+        self.subscription.refresh_from_db()
+        self.assertIsNone(self.subscription.leased_until)
+
+    def test_lease_runs_from_claim_time_during_a_long_drain(self):
+        self.subscription.batch_size = 1
+        self.subscription.save()
+        self.toggle(self.parent, False)
+        clock = [timezone.now()]
+        competing = []
+
+        def send(subscription, payloads, timeout):
+            # Each send fits in the lease, but the whole drain outlasts it.
+            clock[0] += timedelta(seconds=OPTIONS['LEASE'] * 3 / 4)
+            if len(competing) < 2:
+                competing.append(None)
+                competing[-1] = deliver_subscription(subscription.id, options=OPTIONS)
+            return post_batch(subscription, payloads, timeout)
+
+        with mock.patch('flags.webhooks.timezone.now', lambda: clock[0]), \
+                mock.patch('flags.webhooks.post_batch', send):
+            totals = deliver_pending(options=OPTIONS)
+
+        self.assertEqual(competing, [(0, 0), (0, 0)])
+        self.assertEqual(totals['delivered'], 2)
+        self.assertEqual([e['action'] for e in self.receiver.events], ['toggle', 'AUTO_DISABLE'])
+
+    def test_signed_payload(self):
+        self.subscription.secret = 's3cret'
+        self.subscription.save()
+        self.toggle(self.parent, False)
+        deliver_pending(options=OPTIONS)
+        headers, body = self.receiver.headers[0]
+        self.assertEqual(headers['X-Flags-Signature'], sign('s3cret', body))
+
+    def test_throughput_uses_few_requests(self):
+        self.subscription.batch_size = 100
+        self.subscription.save()
+        for i in range(250):
+            AuditLog.objects.create(flag=self.parent, action='CREATE', actor='system', reason=str(i))
+        totals = deliver_pending(options=OPTIONS)
+        self.assertEqual(totals['delivered'], 250)
+        self.assertEqual(len(self.receiver.batches), 3)
+        self.assertEqual([e['reason'] for e in self.receiver.events], [str(i) for i in range(250)])
+
+    def test_command_once(self):
+        self.toggle(self.parent, False)
+        out = StringIO()
+        call_command('deliver_webhooks', '--once', stdout=out)
+        self.assertIn('2 delivered', out.getvalue())
+
+    def test_subscription_api_hides_secret(self):
+        response = self.client.post(
+            reverse('webhook-list-create'),
+            {'url': 'http://example.com/hook', 'secret': 'x', 'actions': ['TOGGLE']},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('secret', response.data)
+        response = self.client.post(
+            reverse('webhook-list-create'), {'url': 'http://example.com/hook', 'actions': 'TOGGLE'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,19 +1,24 @@
 from django.urls import path
-from rest_framework import generics
-from .models import Flag, AuditLog
-from .serializers import FlagCreateSerializer, FlagDetailSerializer
-from .views import FlagToggleAPIView, FlagAuditLogAPIView, FlagListCreateAPIView
+from .views import (
+    FlagToggleAPIView, FlagAuditLogAPIView, FlagListCreateAPIView, FlagDetailAPIView,
+    FlagScheduleListCreateAPIView, FlagScheduleCancelAPIView,
+    FlagDependencyAPIView, FlagDependencyEdgeAPIView, DependencyBatchAPIView,
+    FallbackMetricsAPIView, FlagGraphReportAPIView,
+    WebhookSubscriptionListCreateAPIView, WebhookSubscriptionDetailAPIView,
+)
 
 urlpatterns = [
-    path('flags/', generics.ListCreateAPIView.as_view(
-        queryset=Flag.objects.all(),
-        serializer_class=FlagCreateSerializer  
-    ), name='flag-list-create'),
-    path('flags/<int:pk>/', generics.RetrieveAPIView.as_view(
-        queryset=Flag.objects.all(),
-        serializer_class=FlagDetailSerializer
-    ), name='flag-detail'),
+    path('flags/', FlagListCreateAPIView.as_view(), name='flag-list-create'),
+    path('flags/graph/', FlagGraphReportAPIView.as_view(), name='flag-graph'),
+    path('flags/dependencies/batch/', DependencyBatchAPIView.as_view(), name='dependency-batch'),
+    path('flags/<int:pk>/', FlagDetailAPIView.as_view(), name='flag-detail'),
     path('flags/<int:pk>/toggle/', FlagToggleAPIView.as_view(), name='flag-toggle'),
     path('flags/<int:pk>/audit/', FlagAuditLogAPIView.as_view(), name='flag-audit'),
-    path('flags/', FlagListCreateAPIView.as_view(), name='flag-list-create'),
-]   
\ No newline at end of file
+    path('flags/<int:pk>/dependencies/', FlagDependencyAPIView.as_view(), name='flag-dependencies'),
+    path('flags/<int:pk>/dependencies/<int:dependency_pk>/', FlagDependencyEdgeAPIView.as_view(), name='flag-dependency-edge'),
+    path('flags/<int:pk>/schedule/', FlagScheduleListCreateAPIView.as_view(), name='flag-schedule'),
+    path('flags/<int:pk>/schedule/<int:schedule_pk>/', FlagScheduleCancelAPIView.as_view(), name='flag-schedule-cancel'),
+    path('webhooks/', WebhookSubscriptionListCreateAPIView.as_view(), name='webhook-list-create'),
+    path('webhooks/<int:pk>/', WebhookSubscriptionDetailAPIView.as_view(), name='webhook-detail'),
+    path('metrics/fallback/', FallbackMetricsAPIView.as_view(), name='fallback-metrics'),
+]
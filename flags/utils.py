@@ -1,33 +1,68 @@
-from django.db import transaction
+from collections import defaultdict
+from django.db import connection, transaction
 from django.core.exceptions import ValidationError
 from .models import Flag, Dependency, AuditLog
+from .signals import batched_webhook_events
 
 
 
-def _detect_cycle(start_flag_id, dependency_on_id):
+def _detect_cycle(start_flag_id, dependency_on_ids):
+    """Return True if adding ``start_flag -> dependency_on`` edges would close a cycle.
+
+    All new edges leave ``start_flag``, so a cycle exists exactly when
+    ``start_flag`` is already reachable from one of the new parents. That is
+    answered with a single recursive query that only walks the parents'
+    ancestors, instead of one query per visited node.
+    """
+    dependency_on_ids = list(dependency_on_ids)
+    if not dependency_on_ids:
+        return False
+    if start_flag_id in dependency_on_ids:
+        return True
+
+    placeholders = ', '.join(['%s'] * len(dependency_on_ids))
+    sql = f"""
+        WITH RECURSIVE ancestors(id) AS (
+            SELECT id FROM {Flag._meta.db_table} WHERE id IN ({placeholders})
+            UNION
+            SELECT d.dependency_on_id
+            FROM {Dependency._meta.db_table} d
+            JOIN ancestors a ON d.flag_id = a.id
+        )
+        SELECT 1 FROM ancestors WHERE id = %s LIMIT 1
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*dependency_on_ids, start_flag_id])
+        return cursor.fetchone() is not None
+
+
+def load_dependency_graph():
+    """Return ``{flag_id: set(dependency_on_ids)}`` for every edge, in one query."""
+    graph = defaultdict(set)
+    for flag_id, dependency_on_id in Dependency.objects.values_list('flag_id', 'dependency_on_id'):
+        graph[flag_id].add(dependency_on_id)
+    return graph
 
-    visited = set()
 
-    def dfs(current_id):
-        if current_id == start_flag_id:
+def _graph_reaches(graph, source_id, target_id):
+    """In-memory counterpart of ``_detect_cycle`` for batches touching many flags."""
+    stack = [source_id]
+    seen = {source_id}
+    while stack:
+        current_id = stack.pop()
+        if current_id == target_id:
             return True
-        
-        visited.add(current_id)
-        parents = Dependency.objects.filter(flag_id=current_id).values_list('dependency_on_id', flat=True)
-        for parent_id in parents:
-            if parent_id in visited:
-                
-                if dfs(parent_id):
-                    return True
-        
-        return False
-    
-    return dfs(dependency_on_id)
+        for parent_id in graph.get(current_id, ()):
+            if parent_id not in seen:
+                seen.add(parent_id)
+                stack.append(parent_id)
+    return False
 
 def get_inactive_direct_dependencies(flag):
-    
-    deps = Dependency.objects.filter(flag=flag).select_related('dependency_on')
-    missing = [d.dependency_on.name for d in deps if not d.dependency_on.is_active]
+    # Lock the parents (in id order) so none can be switched off before an
+    # activation that checked them commits.
+    parents = Flag.objects.select_for_update(of=('self',)).filter(dependencies_as_parent__flag=flag).order_by('id')
+    missing = [parent.name for parent in parents if not parent.is_active]
     return missing
         
 
@@ -61,4 +96,93 @@ def cascade_disable(start_flag, actor, reason):
                         old_status=old,
                         new_status=False
                     )
-                queue.append(dependent_id)          
\ No newline at end of file
+                queue.append(dependent_id)
+
+
+def toggle_flag(flag, new_status, actor, reason):
+    """Apply a toggle with the rules enforced by ``FlagToggleAPIView``.
+
+    Returns ``(result, missing)`` where ``result`` is one of ``'activated'``,
+    ``'deactivated'``, ``'no_change'`` or ``'blocked'``; ``missing`` lists the
+    inactive dependencies that blocked an activation.
+    """
+    if new_status and not flag.is_active:
+        missing = get_inactive_direct_dependencies(flag)
+        if missing:
+            return 'blocked', missing
+
+        old = flag.is_active
+        flag.is_active = True
+        flag.save(update_fields=['is_active', 'updated_at'])
+        AuditLog.objects.create(
+            flag=flag,
+            action='toggle',
+            actor=actor,
+            reason=reason,
+            old_status=old,
+            new_status=True
+        )
+        return 'activated', []
+
+    if not new_status and flag.is_active:
+        old = flag.is_active
+        flag.is_active = False
+        flag.save(update_fields=['is_active', 'updated_at'])
+        with batched_webhook_events():
+            AuditLog.objects.create(
+                flag=flag,
+                action='toggle',
+                actor=actor,
+                reason=reason,
+                old_status=old,
+                new_status=False
+            )
+            cascade_disable(flag, actor, f"Parent {flag.name} was disabled. {reason}")
+        return 'deactivated', []
+
+    return 'no_change', []
+
+
+def add_dependency_edges(flag, parents, actor, reason):
+    """Create ``flag -> parent`` edges and audit each one.
+
+    Callers are responsible for the cycle and active-dependency checks.
+    Parents that are already dependencies are skipped; the newly linked
+    parents are returned.
+    """
+    existing = set(
+        Dependency.objects.filter(flag=flag, dependency_on__in=parents).values_list('dependency_on_id', flat=True)
+    )
+    added = [parent for parent in parents if parent.id not in existing]
+    Dependency.objects.bulk_create([Dependency(flag=flag, dependency_on=parent) for parent in added])
+    with batched_webhook_events():
+        for parent in added:
+            AuditLog.objects.create(
+                flag=flag,
+                action='DEPENDENCY_ADD',
+                actor=actor,
+                reason=f"Added dependency on {parent.name}. {reason}".strip(),
+                old_status=flag.is_active,
+                new_status=flag.is_active
+            )
+    return added
+
+
+def remove_dependency_edges(flag, parents, actor, reason):
+    """Delete ``flag -> parent`` edges and audit each one. Returns the unlinked parents."""
+    existing = set(
+        Dependency.objects.filter(flag=flag, dependency_on__in=parents).values_list('dependency_on_id', flat=True)
+    )
+    removed = [parent for parent in parents if parent.id in existing]
+    Dependency.objects.filter(flag=flag, dependency_on_id__in=existing).delete()
+    with batched_webhook_events():
+        for parent in removed:
+            AuditLog.objects.create(
+                flag=flag,
+                action='DEPENDENCY_REMOVE',
+                actor=actor,
+                reason=f"Removed dependency on {parent.name}. {reason}".strip(),
+                old_status=flag.is_active,
+                new_status=flag.is_active
+            )
+    return removed
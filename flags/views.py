@@ -1,82 +1,167 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
-from .utils import get_inactive_direct_dependencies, cascade_disable
-from .models import Flag, AuditLog
-from .serializers import AuditLogSerializer, FlagCreateSerializer, FlagDetailSerializer
+from collections import defaultdict
+from functools import partial
+from django.http import Http404
+from django.db import transaction
+from django.db.models import Prefetch
+from .utils import (
+    toggle_flag, _detect_cycle, _graph_reaches, load_dependency_graph,
+    add_dependency_edges, remove_dependency_edges,
+)
+from .models import Flag, Dependency, AuditLog, ScheduledToggle, WebhookSubscription
+from .routers import use_replica
+from .signals import batched_webhook_events
+from .fallback import get_snapshot_store, serve_with_fallback
+from .graph import get_graph_report
+from .serializers import (
+    AuditLogSerializer, FlagCreateSerializer, FlagDetailSerializer, ScheduledToggleSerializer,
+    DependencyChangeSerializer, DependencyBatchSerializer, WebhookSubscriptionSerializer,
+)
 from rest_framework import generics
 from django.shortcuts import render
 
 def api_docs(request):
     return render(request, 'api_docs.html')
 
+class ReadReplicaMixin:
+    """Serve safe requests from the read replica when one is configured."""
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD', 'OPTIONS'):
+            with use_replica():
+                return super().dispatch(request, *args, **kwargs)
+        return super().dispatch(request, *args, **kwargs)
+
+
 class FlagToggleAPIView(APIView):
     permission_classes = [permissions.AllowAny]  
 
     def patch(self, request, pk):
-        
-        try:
-            flag = Flag.objects.get(pk=pk)
-        except Flag.DoesNotExist:
-            return Response({"error": "Flag not found."}, status=status.HTTP_404_NOT_FOUND)
-
         new_status = request.data.get('active')
         reason = request.data.get('reason', '')
         actor = request.data.get('actor', 'anonymous')
 
-        if new_status not in [True, False]:
-            return Response({"error": "Invalid 'active' value."}, status=status.HTTP_400_BAD_REQUEST)
+        # The flag change, its audit rows and their webhook outbox rows commit
+        # together, with the flag locked from the read onwards.
+        with transaction.atomic():
+            try:
+                flag = Flag.objects.select_for_update().get(pk=pk)
+            except Flag.DoesNotExist:
+                return Response({"error": "Flag not found."}, status=status.HTTP_404_NOT_FOUND)
 
-        
-        if new_status and not flag.is_active:
-            missing = get_inactive_direct_dependencies(flag)
-            if missing:
-                return Response(
-                    {"error": "Missing active dependencies", "missing_dependencies": missing},
-                    status=status.HTTP_409_CONFLICT
-                )
-            
-            old = flag.is_active
-            flag.is_active = True
-            flag.save(update_fields=['is_active', 'updated_at'])
-           
-            AuditLog.objects.create(
-                flag=flag,
-                action='toggle',
-                actor=actor,
-                reason=reason,
-                old_status=old,
-                new_status=True
-            )
-            return Response({"status": "activated"}, status=status.HTTP_200_OK)
-
-       
-        if not new_status and flag.is_active:
-            old = flag.is_active
-            flag.is_active = False
-            flag.save(update_fields=['is_active', 'updated_at'])
-            AuditLog.objects.create(
-                flag=flag,
-                action='toggle',
-                actor=actor,
-                reason=reason,
-                old_status=old,
-                new_status=False
+            if new_status not in [True, False]:
+                return Response({"error": "Invalid 'active' value."}, status=status.HTTP_400_BAD_REQUEST)
+
+            result, missing = toggle_flag(flag, new_status, actor, reason)
+        if result == 'blocked':
+            return Response(
+                {"error": "Missing active dependencies", "missing_dependencies": missing},
+                status=status.HTTP_409_CONFLICT
             )
-            
-            cascade_disable(flag, actor, f"Parent {flag.name} was disabled. {reason}")
-            return Response({"status": "deactivated"}, status=status.HTTP_200_OK)
+        return Response({"status": result}, status=status.HTTP_200_OK)
 
-        return Response({"status": "no_change"}, status=status.HTTP_200_OK)
+class FlagListCreateAPIView(ReadReplicaMixin, generics.ListCreateAPIView):
+    """List and create flags.
 
-class FlagListCreateAPIView(generics.ListCreateAPIView):
-    queryset = Flag.objects.all()
+    Besides the full representation, GET supports two cheaper shapes that
+    are built straight from ``values_list()`` rows without instantiating
+    models or serializers:
+
+    * ``?fields=id,name,is_active`` returns a paginated sparse field set.
+    * ``?view=state`` returns an unpaginated ``{name: is_active}`` mapping.
+    """
+    queryset = Flag.objects.order_by('id').prefetch_related(
+        Prefetch('dependencies_as_child', queryset=Dependency.objects.select_related('dependency_on'))
+    )
+    sparse_fields = ('id', 'name', 'description', 'is_active', 'created_at', 'updated_at', 'dependencies')
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
             return FlagCreateSerializer
         return FlagDetailSerializer
 
+    def list(self, request, *args, **kwargs):
+        fields = request.query_params.get('fields')
+        if fields is not None:
+            fields = list(dict.fromkeys(f.strip() for f in fields.split(',') if f.strip()))
+            if not fields or set(fields) - set(self.sparse_fields):
+                return Response(
+                    {"error": "Invalid 'fields' value.", "allowed_fields": list(self.sparse_fields)},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        return serve_with_fallback(
+            partial(self._list_fresh, request, fields, *args, **kwargs),
+            partial(self._list_stale, request, fields),
+        )
+
+    def _list_fresh(self, request, fields, *args, **kwargs):
+        if request.query_params.get('view') == 'state':
+            return Response(dict(Flag.objects.values_list('name', 'is_active')))
+
+        if not fields:
+            return super().list(request, *args, **kwargs)
+
+        columns = [f for f in fields if f != 'dependencies']
+        with_dependencies = 'dependencies' in fields
+        # The id column is needed to attach dependency names to their rows.
+        query_columns = columns if not with_dependencies or 'id' in columns else ['id'] + columns
+        rows = Flag.objects.order_by('id').values_list(*query_columns)
+        page = self.paginate_queryset(rows)
+        rows = page if page is not None else list(rows)
+
+        data = [dict(zip(query_columns, row)) for row in rows]
+        if with_dependencies:
+            names = defaultdict(list)
+            pairs = Dependency.objects.filter(
+                flag_id__in=[item['id'] for item in data]
+            ).values_list('flag_id', 'dependency_on__name')
+            for flag_id, name in pairs:
+                names[flag_id].append(name)
+            for item in data:
+                item['dependencies'] = names[item['id']]
+                if 'id' not in columns:
+                    del item['id']
+
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def _list_stale(self, request, fields, rows):
+        if request.query_params.get('view') == 'state':
+            return Response({row['name']: row['is_active'] for row in rows})
+
+        fields = fields or FlagDetailSerializer.Meta.fields
+        data = [{field: row[field] for field in fields} for row in rows]
+        page = self.paginate_queryset(data)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(data)
+
+
+class FlagDetailAPIView(ReadReplicaMixin, generics.RetrieveAPIView):
+    queryset = FlagListCreateAPIView.queryset
+    serializer_class = FlagDetailSerializer
+
+    def retrieve(self, request, *args, **kwargs):
+        return serve_with_fallback(partial(super().retrieve, request, *args, **kwargs), self._retrieve_stale)
+
+    def _retrieve_stale(self, rows):
+        pk = int(self.kwargs['pk'])
+        for row in rows:
+            if row['id'] == pk:
+                return Response({field: row[field] for field in FlagDetailSerializer.Meta.fields})
+        raise Http404
+
+
+class FallbackMetricsAPIView(APIView):
+    """How often the read endpoints fell back to the flag snapshot."""
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        return Response(get_snapshot_store().snapshot_metrics(), status=status.HTTP_200_OK)
+
 
 class FlagAuditLogAPIView(generics.ListAPIView):
     serializer_class = AuditLogSerializer
@@ -85,9 +170,233 @@ class FlagAuditLogAPIView(generics.ListAPIView):
 
 
 
-class FlagAuditLogAPIView(generics.ListAPIView):
+class FlagAuditLogAPIView(ReadReplicaMixin, generics.ListAPIView):
     serializer_class = AuditLogSerializer
 
     def get_queryset(self):
         flag_id = self.kwargs['pk']
         return AuditLog.objects.filter(flag_id=flag_id).order_by('-timestamp')
+
+
+class FlagScheduleListCreateAPIView(generics.ListCreateAPIView):
+    serializer_class = ScheduledToggleSerializer
+    permission_classes = [permissions.AllowAny]
+
+    def get_queryset(self):
+        return ScheduledToggle.objects.filter(flag_id=self.kwargs['pk']).order_by('run_at', 'id')
+
+    def perform_create(self, serializer):
+        flag = generics.get_object_or_404(Flag, pk=self.kwargs['pk'])
+        serializer.save(flag=flag)
+
+
+class FlagScheduleCancelAPIView(APIView):
+    permission_classes = [permissions.AllowAny]
+
+    def delete(self, request, pk, schedule_pk):
+        updated = ScheduledToggle.objects.filter(
+            pk=schedule_pk, flag_id=pk, status='PENDING'
+        ).update(status='CANCELLED')
+        if updated:
+            return Response({"status": "cancelled"}, status=status.HTTP_200_OK)
+        if not ScheduledToggle.objects.filter(pk=schedule_pk, flag_id=pk).exists():
+            return Response({"error": "Scheduled toggle not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response({"error": "Scheduled toggle is no longer pending."}, status=status.HTTP_409_CONFLICT)
+
+
+def _dependency_names(flag):
+    return list(
+        Dependency.objects.filter(flag=flag).order_by('dependency_on__name').values_list('dependency_on__name', flat=True)
+    )
+
+
+def _check_new_dependencies(flag, parents):
+    """Return an error ``Response`` if ``parents`` may not be linked to ``flag``."""
+    if flag.is_active:
+        missing = [parent.name for parent in parents if not parent.is_active]
+        if missing:
+            return Response(
+                {"error": "Missing active dependencies", "missing_dependencies": missing},
+                status=status.HTTP_409_CONFLICT
+            )
+    if _detect_cycle(flag.id, [parent.id for parent in parents]):
+        return Response({"error": "Circular dependency detected"}, status=status.HTTP_400_BAD_REQUEST)
+    return None
+
+
+def _lock_flag_and_parents(pk, parent_ids):
+    """Lock a flag and the parents about to be linked to it, together and in id order.
+
+    Concurrent edits that share a flag then run one after the other, so a
+    reverse edge or a parent being switched off cannot slip past the checks.
+    Returns ``(flag, parents)`` with ``parents`` in ``parent_ids`` order.
+    """
+    locked = Flag.objects.select_for_update().filter(id__in={pk, *parent_ids}).order_by('id')
+    flags = {flag.id: flag for flag in locked}
+    if pk not in flags:
+        raise Http404
+    return flags[pk], [flags[parent_id] for parent_id in parent_ids if parent_id in flags]
+
+
+class FlagDependencyAPIView(APIView):
+    """List, add or remove the dependencies of one flag by name."""
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, pk):
+        flag = generics.get_object_or_404(Flag, pk=pk)
+        return Response({"dependencies": _dependency_names(flag)}, status=status.HTTP_200_OK)
+
+    def post(self, request, pk):
+        serializer = DependencyChangeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        with transaction.atomic():
+            flag, parents = _lock_flag_and_parents(pk, [parent.id for parent in data['dependencies']])
+            error = _check_new_dependencies(flag, parents)
+            if error:
+                return error
+            added = add_dependency_edges(flag, parents, data['actor'], data['reason'])
+
+        return Response(
+            {"added": [parent.name for parent in added], "dependencies": _dependency_names(flag)},
+            status=status.HTTP_200_OK
+        )
+
+    def delete(self, request, pk):
+        serializer = DependencyChangeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        with transaction.atomic():
+            flag = generics.get_object_or_404(Flag.objects.select_for_update(), pk=pk)
+            removed = remove_dependency_edges(flag, data['dependencies'], data['actor'], data['reason'])
+
+        return Response(
+            {"removed": [parent.name for parent in removed], "dependencies": _dependency_names(flag)},
+            status=status.HTTP_200_OK
+        )
+
+
+class FlagDependencyEdgeAPIView(APIView):
+    """Add (PUT) or remove (DELETE) a single ``flag -> dependency_on`` edge."""
+    permission_classes = [permissions.AllowAny]
+
+    def put(self, request, pk, dependency_pk):
+        actor = request.data.get('actor', 'anonymous')
+        reason = request.data.get('reason', '')
+        with transaction.atomic():
+            flag, parents = _lock_flag_and_parents(pk, [dependency_pk])
+            if not parents:
+                raise Http404
+            error = _check_new_dependencies(flag, parents)
+            if error:
+                return error
+            added = add_dependency_edges(flag, parents, actor, reason)
+        return Response({"status": "added" if added else "no_change"}, status=status.HTTP_200_OK)
+
+    def delete(self, request, pk, dependency_pk):
+        actor = request.data.get('actor', 'anonymous')
+        reason = request.data.get('reason', '')
+        with transaction.atomic():
+            flag = generics.get_object_or_404(Flag.objects.select_for_update(), pk=pk)
+            parent = generics.get_object_or_404(Flag, pk=dependency_pk)
+            removed = remove_dependency_edges(flag, [parent], actor, reason)
+        if not removed:
+            return Response({"error": "Dependency not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response({"status": "removed"}, status=status.HTTP_200_OK)
+
+
+class DependencyBatchAPIView(APIView):
+    """Apply many edge additions and removals across flags, all or nothing.
+
+    The dependency graph is loaded once and every addition is checked
+    against it in memory, including the edges added earlier in the batch.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request):
+        serializer = DependencyBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        with transaction.atomic():
+            # Re-read the flags under lock (in id order) so their status
+            # cannot change between the checks and the writes.
+            locked = Flag.objects.select_for_update().filter(
+                id__in=[flag.id for flag in data['flags'].values()]
+            ).order_by('id')
+            flags = {flag.name: flag for flag in locked}
+            graph = load_dependency_graph()
+            to_remove = defaultdict(list)
+            for edge in data['remove']:
+                flag, parent = flags[edge['flag']], flags[edge['dependency_on']]
+                graph[flag.id].discard(parent.id)
+                to_remove[flag].append(parent)
+
+            to_add = defaultdict(list)
+            for edge in data['add']:
+                flag, parent = flags[edge['flag']], flags[edge['dependency_on']]
+                if flag.is_active and not parent.is_active:
+                    return Response(
+                        {"error": "Missing active dependencies", "edge": edge, "missing_dependencies": [parent.name]},
+                        status=status.HTTP_409_CONFLICT
+                    )
+                if _graph_reaches(graph, parent.id, flag.id):
+                    return Response(
+                        {"error": "Circular dependency detected", "edge": edge},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                graph[flag.id].add(parent.id)
+                to_add[flag].append(parent)
+
+            removed = []
+            added = []
+            with batched_webhook_events():
+                for flag, parents in to_remove.items():
+                    removed += [
+                        {"flag": flag.name, "dependency_on": parent.name}
+                        for parent in remove_dependency_edges(flag, parents, data['actor'], data['reason'])
+                    ]
+                for flag, parents in to_add.items():
+                    added += [
+                        {"flag": flag.name, "dependency_on": parent.name}
+                        for parent in add_dependency_edges(flag, parents, data['actor'], data['reason'])
+                    ]
+
+        return Response({"added": added, "removed": removed}, status=status.HTTP_200_OK)
+
+
+class FlagGraphReportAPIView(ReadReplicaMixin, APIView):
+    """Depth, fan-in/fan-out and transitive dependent counts for the dependency graph.
+
+    ``?top=N`` sets the number of hotspots (default 10); ``?all=true`` adds
+    the statistics of every flag.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        try:
+            top = int(request.query_params.get('top', 10))
+        except ValueError:
+            top = -1
+        if not 1 <= top <= 1000:
+            return Response({"error": "'top' must be between 1 and 1000."}, status=status.HTTP_400_BAD_REQUEST)
+
+        report = get_graph_report(top)
+        data = {key: value for key, value in report.items() if key != 'stats'}
+        if request.query_params.get('all') == 'true':
+            data['stats'] = report['stats']
+        return Response(data, status=status.HTTP_200_OK)
+
+
+class WebhookSubscriptionListCreateAPIView(generics.ListCreateAPIView):
+    queryset = WebhookSubscription.objects.order_by('id')
+    serializer_class = WebhookSubscriptionSerializer
+    permission_classes = [permissions.AllowAny]
+
+
+class WebhookSubscriptionDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
+    queryset = WebhookSubscription.objects.all()
+    serializer_class = WebhookSubscriptionSerializer
+    permission_classes = [permissions.AllowAny]
@@ -0,0 +1,152 @@
+import hashlib
+import hmac
+import json
+import urllib.error
+import urllib.request
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Min, Q
+from django.utils import timezone
+from .models import WebhookEvent, WebhookSubscription
+
+DEFAULTS = {
+    'TIMEOUT': 5,
+    'MAX_ATTEMPTS': 8,
+    'BACKOFF_BASE': 2,
+    'BACKOFF_MAX': 600,
+    'LEASE': 60,
+}
+
+
+def webhook_settings():
+    return {**DEFAULTS, **getattr(settings, 'FLAGS_WEBHOOKS', {})}
+
+
+def backoff(attempts, options):
+    """Seconds to wait before retry number ``attempts`` (exponential, capped)."""
+    return min(options['BACKOFF_BASE'] * 2 ** (attempts - 1), options['BACKOFF_MAX'])
+
+
+def sign(secret, body):
+    return 'sha256=' + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def post_batch(subscription, payloads, timeout):
+    """POST ``{"events": [...]}`` to the subscriber. Returns ``None`` or an error message."""
+    body = json.dumps({'events': payloads}).encode()
+    request = urllib.request.Request(subscription.url, data=body, method='POST')
+    request.add_header('Content-Type', 'application/json')
+    if subscription.secret:
+        request.add_header('X-Flags-Signature', sign(subscription.secret, body))
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+    except urllib.error.HTTPError as exc:
+        return f'HTTP {exc.code}'
+    except (urllib.error.URLError, OSError) as exc:
+        return str(getattr(exc, 'reason', exc))
+    return None
+
+
+def deliver_subscription(subscription_id, now=None, options=None):
+    """Send the next batch of one subscriber's queue.
+
+    The batch is claimed by leasing the subscription for ``LEASE`` seconds
+    in a short transaction, sent with no transaction open, and its outcome
+    recorded in a second one. Competing workers skip leased subscribers,
+    and with the queue read strictly in id order that keeps events in order
+    per flag; a lease left by a crashed worker simply expires. ``now`` only
+    decides whether the batch is due: the lease and the retry delay run
+    from the actual claim time, so a long drain never hands out a lease
+    that has already expired. A failed batch stays at the head of the
+    queue and is retried with exponential backoff; each event is marked
+    ``FAILED`` once it has been tried ``MAX_ATTEMPTS`` times. Returns
+    ``(delivered, failed)`` event counts.
+    """
+    options = options or webhook_settings()
+    now = now or timezone.now()
+    with transaction.atomic():
+        claimed_at = timezone.now()
+        qs = WebhookSubscription.objects.filter(
+            Q(leased_until__isnull=True) | Q(leased_until__lte=claimed_at), pk=subscription_id, is_active=True
+        )
+        if connection.features.has_select_for_update_skip_locked:
+            qs = qs.select_for_update(skip_locked=True)
+        subscription = qs.first()
+        if subscription is None:
+            return 0, 0
+
+        batch = list(subscription.events.filter(status='PENDING').order_by('id')[:subscription.batch_size])
+        if not batch or batch[0].next_attempt_at > now:
+            return 0, 0
+        lease = claimed_at + timedelta(seconds=options['LEASE'])
+        subscription.leased_until = lease
+        subscription.save(update_fields=['leased_until'])
+
+    error = post_batch(subscription, [event.payload for event in batch], options['TIMEOUT'])
+
+    ids = [event.id for event in batch]
+    with transaction.atomic():
+        released = WebhookSubscription.objects.filter(pk=subscription.pk, leased_until=lease).update(leased_until=None)
+        if not released:
+            # The lease expired and another worker owns the queue now.
+            return 0, 0
+        if error is None:
+            WebhookEvent.objects.filter(id__in=ids).update(status='DELIVERED', delivered_at=timezone.now())
+            return len(batch), 0
+
+        # The head has been tried the most; it sets the pace of the queue.
+        retry_at = claimed_at + timedelta(seconds=backoff(batch[0].attempts + 1, options))
+        WebhookEvent.objects.filter(id__in=ids).update(
+            attempts=F('attempts') + 1,
+            last_error=error,
+            next_attempt_at=retry_at,
+        )
+        failed = WebhookEvent.objects.filter(id__in=ids, attempts__gte=options['MAX_ATTEMPTS']).update(status='FAILED')
+        return 0, failed
+
+
+def _queue_heads():
+    """The oldest pending event of each active subscriber; only heads are ever due."""
+    heads = (
+        WebhookEvent.objects.filter(status='PENDING', subscription__is_active=True)
+        .values('subscription')
+        .annotate(head=Min('id'))
+        .values('head')
+    )
+    return WebhookEvent.objects.filter(id__in=heads)
+
+
+def deliver_pending(now=None, options=None):
+    """Drain every subscriber whose queue head is due, batch by batch.
+
+    Returns a dict with the number of ``delivered`` and ``failed`` events
+    and ``batches`` sent successfully or dead-lettered.
+    """
+    options = options or webhook_settings()
+    now = now or timezone.now()
+    subscription_ids = list(
+        _queue_heads().filter(next_attempt_at__lte=now).values_list('subscription_id', flat=True)
+    )
+    totals = {'delivered': 0, 'failed': 0, 'batches': 0}
+    for subscription_id in subscription_ids:
+        while True:
+            delivered, failed = deliver_subscription(subscription_id, now=now, options=options)
+            if not delivered and not failed:
+                break
+            totals['delivered'] += delivered
+            totals['failed'] += failed
+            totals['batches'] += 1
+    return totals
+
+
+def next_attempt_at():
+    """When the earliest queue head not leased by another worker becomes due, or ``None``."""
+    return (
+        _queue_heads()
+        .exclude(subscription__leased_until__gt=timezone.now())
+        .order_by('next_attempt_at')
+        .values_list('next_attempt_at', flat=True)
+        .first()
+    )